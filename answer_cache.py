@@ -0,0 +1,263 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from chat_context import extract_facts
+from gazetteer import normalize as place_key
+from gazetteer import places_mentioned
+from state_store import get_store
+
+ANSWER_CACHE_ENTRIES = int(os.getenv("ANBUPAYAN_ANSWER_CACHE_ENTRIES", 2000))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANBUPAYAN_ANSWER_CACHE_THRESHOLD", 0.92))
+ANSWER_CACHE_TTL = int(os.getenv("ANBUPAYAN_ANSWER_CACHE_TTL", 24 * 3600))
+# Seconds between pulls of answers added by other worker processes.
+ANSWER_CACHE_SYNC = float(os.getenv("ANBUPAYAN_ANSWER_CACHE_SYNC", 5))
+VECTOR_DIM = 2048
+NGRAM_SIZES = (3, 4)
+# Short follow-ups such as "Trains?" only make sense after the previous turn.
+MIN_WORDS = 4
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_NUMBER = re.compile(r"\d+")
+# Dropped before embedding so phrasing ("how do I" / "how to" / "steps
+# to") does not outweigh what is actually being asked.
+_FILLER_WORDS = {
+    "a", "an", "the", "of", "in", "on", "for", "and", "or", "is", "are", "do", "does",
+    "i", "can", "could", "how", "what", "which", "when", "where", "should", "with", "by", "at", "be",
+    "please", "tell", "steps", "way", "ticket", "tickets",
+}
+# What the question asks for. Two questions only share an answer when they
+# ask for the same things: "book a train" is not "best time for a train".
+_INTENT_WORDS = {
+    "book": "book", "booking": "book", "reserve": "book", "reservation": "book",
+    "cost": "cost", "costs": "cost", "price": "cost", "prices": "cost", "fare": "cost", "fares": "cost",
+    "cheap": "cost", "cheapest": "cost", "budget": "cost", "expensive": "cost",
+    "time": "time", "timing": "time", "timings": "time", "when": "time", "season": "time", "month": "time",
+    "cancel": "cancel", "cancellation": "cancel", "refund": "cancel",
+    "visit": "visit", "see": "visit", "places": "visit",
+    "reach": "reach", "distance": "reach", "far": "reach", "long": "reach",
+}
+# How the traveller gets there: an answer about trains is no answer about buses.
+_MODE_WORDS = {
+    "train": "train", "trains": "train", "rail": "train", "railway": "train", "railways": "train", "irctc": "train",
+    "bus": "bus", "buses": "bus", "ksrtc": "bus", "tnstc": "bus", "redbus": "bus",
+    "flight": "flight", "flights": "flight", "fly": "flight", "flying": "flight", "plane": "flight", "air": "flight",
+    "airline": "flight", "airlines": "flight", "airport": "flight",
+    "cab": "cab", "cabs": "cab", "taxi": "cab", "taxis": "cab", "ola": "cab", "uber": "cab",
+    "car": "car", "cars": "car", "drive": "car", "driving": "car", "rental": "car",
+    "bike": "bike", "bikes": "bike", "motorcycle": "bike", "scooter": "bike",
+    "ferry": "ferry", "boat": "ferry", "ship": "ferry", "cruise": "ferry",
+}
+_CONTEXT_WORDS = {
+    "me", "my", "mine", "we", "us", "our", "ours",
+    "it", "this", "that", "these", "those", "there", "them", "same",
+    "above", "earlier", "previous", "again", "also", "else", "more",
+}
+
+
+def normalize(question):
+    return " ".join(_NON_WORD.sub(" ", question.casefold()).split())
+
+
+def embed(question):
+    # Hashed character n-grams of each content word: works for every script
+    # the chatbot answers in, tolerates "book"/"booking", and needs no model
+    # download.
+    vector = np.zeros(VECTOR_DIM, dtype=np.float32)
+    for word in normalize(question).split():
+        if word in _FILLER_WORDS:
+            continue
+        text = f" {word} "
+        for size in NGRAM_SIZES:
+            for start in range(max(1, len(text) - size + 1)):
+                digest = zlib.crc32(text[start:start + size].encode("utf-8"))
+                vector[digest % VECTOR_DIM] += 1.0 if digest & 0x80000000 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def question_places(question):
+    # Every known place, whatever its case. The place after "from" comes
+    # first and the rest keep their order, so "from X to Y" and "to Y from
+    # X" agree but "X to Y" and "Y to X" do not.
+    words = place_key(question).split()
+    places = [(index == 0 or words[index - 1] != "from", place) for index, place in places_mentioned(question)]
+    return tuple(place for _, place in sorted(places, key=lambda item: item[0]))
+
+
+def question_details(question):
+    # Places, travel modes, budgets and dates have to agree exactly: in a
+    # long question "Madurai" vs "Mumbai" or "train" vs "bus" barely moves
+    # the similarity score. A place the gazetteer does not know is still
+    # compared through the facts when it is written with a capital.
+    words = normalize(question).split()
+    facts = {
+        name: normalize(value)
+        for name, value in extract_facts(question).items()
+        if name not in ("departure", "destination") or not places_mentioned(value)
+    }
+    intents = frozenset(_INTENT_WORDS[word] for word in words if word in _INTENT_WORDS)
+    modes = frozenset(_MODE_WORDS[word] for word in words if word in _MODE_WORDS)
+    return facts, question_places(question), intents, modes, frozenset(_NUMBER.findall(question))
+
+
+def same_details(first, second):
+    return first == second
+
+
+def is_context_free(question, memory):
+    # Answers that could draw on the session's stored details, or on the
+    # previous turn, are never shared between sessions.
+    words = normalize(question).split()
+    if len(words) < MIN_WORDS or _CONTEXT_WORDS.intersection(words):
+        return False
+    return all(name in extract_facts(question) for name in memory)
+
+
+def entry_key(question, language):
+    return hashlib.sha256(f"{language}\n{normalize(question)}".encode("utf-8")).hexdigest()
+
+
+class SemanticAnswerCache:
+    # The vectors live in this process; the answers themselves are also
+    # written to the shared state store, and every process pulls in what
+    # the others added, so a new worker starts warm.
+
+    def __init__(self, max_entries=ANSWER_CACHE_ENTRIES, threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL, store=None, sync=ANSWER_CACHE_SYNC):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl = ttl
+        self.sync = sync
+        self._store = store
+        self._slots = {}
+        self._synced = 0  # write sequence of the last row pulled
+        self._synced_at = None
+        self._added = 0
+        self._vectors = np.zeros((max_entries, VECTOR_DIM), dtype=np.float32)
+        self._live = np.zeros(max_entries, dtype=bool)
+        self._created = np.zeros(max_entries)
+        self._used = np.zeros(max_entries)
+        self._uses = np.zeros(max_entries, dtype=np.int64)
+        self._entries = [None] * max_entries
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        with self._lock:
+            return int(self._live.sum())
+
+    def _expire(self, now):
+        self._live &= self._created > now - self.ttl
+
+    @property
+    def store(self):
+        return self._store or get_store()
+
+    def _pull(self, now):
+        # Answers other processes added since the last pull, in write order.
+        # Pulling by the store's write sequence rather than by timestamp
+        # means clock skew between hosts cannot make a row look old.
+        with self._lock:
+            if self._synced_at is not None and now - self._synced_at < self.sync:
+                return
+            self._synced_at = now
+            after = self._synced
+        for seq, key, value, updated_at in self.store.changed_since("answers", after, self.max_entries):
+            entry = json.loads(value)
+            self._insert(key, entry["question"], entry["language"], entry["answer"], updated_at)
+            with self._lock:
+                self._synced = seq
+
+    def lookup(self, question, language):
+        query = embed(question)
+        details = question_details(question)
+        now = time.time()
+        self._pull(now)
+        with self._lock:
+            self._expire(now)
+            scores = self._vectors @ query
+            scores[~self._live] = -1.0
+            for index in np.argsort(scores)[::-1]:
+                if scores[index] < self.threshold:
+                    break
+                _, entry_language, entry_details, answer = self._entries[index]
+                if entry_language == language and same_details(entry_details, details):
+                    self._used[index] = now
+                    self._uses[index] += 1
+                    self.hits += 1
+                    return answer, float(scores[index])
+            self.misses += 1
+            return None, 0.0
+
+    def _free_slot(self):
+        free = np.flatnonzero(~self._live)
+        if free.size:
+            return int(free[0])
+        # Least frequently used among the least recently used half, so a
+        # brand-new entry is not the first to go.
+        by_age = np.argsort(self._used)[:max(1, self.max_entries // 2)]
+        return int(by_age[np.argmin(self._uses[by_age])])
+
+    def _insert(self, key, question, language, answer, created):
+        vector = embed(question)
+        details = question_details(question)
+        with self._lock:
+            if key in self._slots and self._live[self._slots[key]]:
+                return
+            self._expire(time.time())
+            index = self._free_slot()
+            if self._entries[index] is not None:
+                self._slots.pop(self._entries[index][0], None)
+            self._vectors[index] = vector
+            self._live[index] = True
+            self._created[index] = created
+            self._used[index] = created
+            self._uses[index] = 0
+            self._entries[index] = (key, language, details, answer)
+            self._slots[key] = index
+
+    def add(self, question, language, answer):
+        key = entry_key(question, language)
+        self._insert(key, question, language, answer, time.time())
+        entry = {"question": question, "language": language, "answer": answer}
+        self.store.set("answers", key, json.dumps(entry, ensure_ascii=False), self.ttl)
+        self._added += 1
+        if self._added % 100 == 0:
+            self.store.trim("answers", self.max_entries)
+
+    def clear(self):
+        with self._lock:
+            self._live[:] = False
+            self._entries = [None] * self.max_entries
+            self._slots.clear()
+        self.store.clear("answers")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+
+def get_answer_cache():
+    # One index per process, so a question answered for one user is ready
+    # for the next.
+    global _answer_cache
+    with _answer_cache_lock:
+        if _answer_cache is None:
+            _answer_cache = SemanticAnswerCache()
+        return _answer_cache
@@ -0,0 +1,218 @@
+# Headless batch generation of itineraries and budgets.
+#
+#   python batch_generate.py requests.jsonl --out batch_output --concurrency 8 --rate 4
+#
+# Each input row (JSONL object or CSV record) describes one request:
+#   kind         "itinerary" or "budget"
+#   departure, destination, days, budget, language
+#   interests    itineraries only
+#   people       budgets only
+#   suggestion   optional
+#   id           optional, defaults to a hash of the row
+#
+# Results are appended to <out>/results.jsonl as they finish and PDFs are
+# written to <out>/pdfs/. Rerunning with the same --out skips requests that
+# already succeeded, so an interrupted batch can simply be started again.
+# --combined-pdf also writes every successful result into one document.
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import planner
+from llm_client import MAX_CONCURRENCY, configure_client, is_transient
+from pdf_export import generate_budget_pdf, generate_combined_pdf, generate_itinerary_pdf
+from rate_limit import TokenBucket
+from response_cache import make_key
+from text_processing import parse_budget_text
+
+
+def read_requests(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+    for row in rows:
+        row = {key: value for key, value in row.items() if value not in (None, "")}
+        row.setdefault("kind", "itinerary")
+        row.setdefault("language", "English")
+        row.setdefault("id", make_key(**row)[:16])
+        yield row
+
+
+def completed_ids(results_path):
+    done = set()
+    if os.path.exists(results_path):
+        with open(results_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # a line cut short by an interrupted run
+                if result.get("status") == "ok":
+                    done.add(result["id"])
+    return done
+
+
+def with_retries(call, retries, backoff):
+    # Only for errors that may pass, such as rate limits that outlast the
+    # client's own retries. A row with a missing or invalid field fails at
+    # once instead of costing more calls.
+    for attempt in range(retries + 1):
+        try:
+            return call(), attempt
+        except Exception as e:
+            if attempt == retries or not is_transient(e):
+                raise
+            time.sleep(backoff * (2 ** attempt) * (0.5 + random.random()))
+
+
+def generate(row):
+    language = row["language"]
+    if row["kind"] == "budget":
+        cleaned = planner.get_budget_plan(
+            location=f"{row['departure']} to {row['destination']}",
+            days=int(row["days"]),
+            user_budget=int(row["budget"]),
+            people=int(row.get("people", 1)),
+            suggestion=row.get("suggestion"),
+            language=language,
+            departure=row["departure"],
+        )
+        table_data, notes, total_row_idx = parse_budget_text(cleaned)
+        return {"text": cleaned, "table": table_data, "notes": notes, "total_row": total_row_idx}
+    text = planner.generate_itinerary(
+        row["departure"], row["destination"], int(row["days"]), int(row["budget"]),
+        row.get("interests", ""), language, suggestion=row.get("suggestion"),
+    )
+    return {"text": text}
+
+
+def write_pdf(row, result, path):
+    # Rendered straight into the file, not through an in-memory copy.
+    with open(path, "wb") as f:
+        if row["kind"] == "budget":
+            generate_budget_pdf(
+                result["table"], result["notes"], language=row["language"],
+                highlight_row_idx=result.get("total_row"), output=f,
+            )
+        else:
+            generate_itinerary_pdf(result["text"], language=row["language"], output=f)
+
+
+def successful_results(results_path):
+    # Read lazily, so a combined PDF of a large batch never holds every
+    # result in memory at once.
+    with open(results_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if result.get("status") == "ok":
+                yield result
+
+
+def combined_documents(results_path):
+    # The (kind, language, content, title) entries generate_combined_pdf takes.
+    for result in successful_results(results_path):
+        row = result["request"]
+        if row["kind"] == "budget":
+            content = (result["table"], result["notes"], result.get("total_row"))
+        else:
+            content = result["text"]
+        yield row["kind"], row["language"], content, f"{result['id']}: {row['departure']} to {row['destination']}"
+
+
+def write_combined_pdf(results_path, path):
+    with open(path, "wb") as f:
+        generate_combined_pdf(combined_documents(results_path), output=f)
+
+
+def run_batch(rows, out_dir, concurrency=4, rate=0, burst=None, retries=3, backoff=1.0, write_pdfs=True):
+    pdf_dir = os.path.join(out_dir, "pdfs")
+    os.makedirs(pdf_dir, exist_ok=True)
+    results_path = os.path.join(out_dir, "results.jsonl")
+    done = completed_ids(results_path)
+    pending = [row for row in rows if row["id"] not in done]
+    bucket = TokenBucket(rate, burst)
+    write_lock = threading.Lock()
+    summary = {"ok": 0, "error": 0, "skipped": len(done)}
+
+    def work(row):
+        started = time.perf_counter()
+
+        def attempt():
+            bucket.acquire()
+            return generate(row)
+
+        try:
+            result, retried = with_retries(attempt, retries, backoff)
+            if write_pdfs:
+                pdf_path = os.path.join(pdf_dir, f"{row['id']}.pdf")
+                write_pdf(row, result, pdf_path)
+                result["pdf"] = pdf_path
+        except Exception as e:
+            return {"id": row["id"], "status": "error", "error": f"{type(e).__name__}: {e}", "request": row}
+        result.update({
+            "id": row["id"],
+            "status": "ok",
+            "request": row,
+            "retries": retried,
+            "seconds": round(time.perf_counter() - started, 3),
+        })
+        return result
+
+    with open(results_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(work, row) for row in pending]
+        for future in as_completed(futures):
+            result = future.result()
+            summary[result["status"]] += 1
+            with write_lock:
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                out.flush()
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate itineraries and budgets in bulk.")
+    parser.add_argument("input", help="JSONL or CSV file of requests")
+    parser.add_argument("--out", default="batch_output", help="output directory")
+    parser.add_argument("--concurrency", type=int, default=4, help="parallel requests")
+    parser.add_argument("--rate", type=float, default=0, help="max requests per second, 0 for unlimited")
+    parser.add_argument("--burst", type=int, default=None, help="token bucket size")
+    parser.add_argument("--retries", type=int, default=3, help="retries of a request after a transient error")
+    parser.add_argument("--backoff", type=float, default=1.0, help="base retry delay in seconds")
+    parser.add_argument("--no-pdf", action="store_true", help="skip writing PDFs")
+    parser.add_argument("--combined-pdf", help="also write every successful result into this one PDF")
+    parser.add_argument("--fake", action="store_true", help="use the offline fake model instead of the configured backend")
+    parser.add_argument("--fake-latency", type=float, default=0.0, help="seconds per fake call")
+    args = parser.parse_args(argv)
+
+    # The client's in-flight cap must not be lower than the batch concurrency.
+    configure_client(
+        backend="fake" if args.fake else None, fake_latency=args.fake_latency,
+        max_concurrency=max(args.concurrency, MAX_CONCURRENCY),
+    )
+
+    started = time.perf_counter()
+    summary = run_batch(
+        list(read_requests(args.input)), args.out,
+        concurrency=args.concurrency, rate=args.rate, burst=args.burst,
+        retries=args.retries, backoff=args.backoff, write_pdfs=not args.no_pdf,
+    )
+    if args.combined_pdf:
+        write_combined_pdf(os.path.join(args.out, "results.jsonl"), args.combined_pdf)
+    elapsed = time.perf_counter() - started
+    print(f"ok={summary['ok']} error={summary['error']} skipped={summary['skipped']} in {elapsed:.1f}s")
+    return 1 if summary["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+# Compares two result files from benchmarks/run.py.
+#
+#   python -m benchmarks.compare before.json after.json --threshold 0.2
+#
+# Exits with status 1 if any shared benchmark got slower (median time) or
+# used more peak memory by more than the threshold.
+import argparse
+import json
+import sys
+
+COMPARED_METRICS = ("median_ms", "peak_kib")
+
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def compare(before, after, threshold):
+    rows = []
+    regressions = []
+    for name in sorted(set(before) & set(after)):
+        for metric in COMPARED_METRICS:
+            if metric not in before[name] or metric not in after[name]:
+                continue
+            old, new = before[name][metric], after[name][metric]
+            ratio = new / old if old else float("inf")
+            rows.append((name, metric, old, new, ratio))
+            if ratio > 1 + threshold:
+                regressions.append(name)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown, 0.2 = 20%%")
+    args = parser.parse_args()
+
+    rows, regressions = compare(load(args.before), load(args.after), args.threshold)
+    for name, metric, old, new, ratio in rows:
+        flag = "  REGRESSION" if ratio > 1 + args.threshold else ""
+        print(f"{name:<48}{metric:<11}{old:12.3f}{new:12.3f}{ratio:8.2f}x{flag}")
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+# Per-rerun PDF cost before and after memoized, on-demand rendering.
+#
+#   python -m benchmarks.pdf_rerun [--reruns 20]
+#
+# "before" renders the PDF on every rerun, as the pages used to. "after"
+# is what a rerun costs now (building the deferred download callable) and
+# what a click costs once the document has been rendered.
+import argparse
+import functools
+import time
+
+import pdf_export
+
+
+def sample_itinerary(days=30):
+    lines = []
+    for day in range(1, days + 1):
+        lines.append(f"Day {day}:")
+        lines.append(f"Morning: Visit the old fort and museum, entry ₹{200 + day * 10}.")
+        lines.append(f"Afternoon: Lunch at a local mess (₹{350 + day}) and a heritage walk.")
+        lines.append(f"Evening: Street food trail and market visit, ₹{500 + day * 5}.")
+        lines.append(f"Stay: Budget hotel near the station, ₹{1800 + day * 20} per night.")
+    lines.append("Category | Estimated Cost (INR)")
+    for category in ("Travel", "Accommodation", "Food", "Activities"):
+        lines.append(f"{category} | {days * 1500}")
+    lines.append(f"Total Estimated Cost | {days * 6000}")
+    lines.append("Fits within budget")
+    return "\n".join(lines)
+
+
+def sample_budget_table(rows=200):
+    table = [["Category", "Details", "Estimated Cost (INR)"]]
+    categories = ("Transport", "Accommodation", "Food", "Attractions/Activities", "Miscellaneous")
+    for i in range(rows):
+        details = f"Item {i}: hotel/restaurant/attraction breakdown with a fairly long description number {i}"
+        table.append([categories[i % len(categories)], details, f"{1000 + i * 25:,}"])
+    table.append(["Total Estimated Cost", "", f"{sum(1000 + i * 25 for i in range(rows)):,}"])
+    return table, "Fits within budget", len(table) - 1
+
+
+def per_call_ms(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def run(reruns):
+    itinerary = sample_itinerary()
+    table, notes, total_idx = sample_budget_table()
+    cases = {
+        "itinerary_30_days": (
+            lambda: pdf_export.generate_itinerary_pdf(itinerary, language="English"),
+            lambda: functools.partial(pdf_export.itinerary_pdf_bytes, itinerary, "English"),
+            lambda: pdf_export.itinerary_pdf_bytes(itinerary, "English"),
+        ),
+        "budget_200_rows": (
+            lambda: pdf_export.generate_budget_pdf(table, notes, language="English", highlight_row_idx=total_idx),
+            lambda: functools.partial(pdf_export.budget_pdf_bytes, table, notes, "English", total_idx),
+            lambda: pdf_export.budget_pdf_bytes(table, notes, "English", total_idx),
+        ),
+    }
+    results = {}
+    for name, (render, deferred, click) in cases.items():
+        render()  # font registration and imports are not part of the measurement
+        before = per_call_ms(render, reruns)
+        after_rerun = per_call_ms(deferred, reruns)
+        first_click = per_call_ms(click, 1)
+        cached_click = per_call_ms(click, reruns)
+        results[name] = {
+            "before_per_rerun_ms": before,
+            "after_per_rerun_ms": after_rerun,
+            "after_first_click_ms": first_click,
+            "after_cached_click_ms": cached_click,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reruns", type=int, default=20)
+    args = parser.parse_args()
+    for name, result in run(args.reruns).items():
+        print(name)
+        for metric, value in result.items():
+            print(f"  {metric:<24}{value:10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# PDF render time and peak memory against document size.
+#
+#   python -m benchmarks.pdf_scale [--quick] [--output scale.json]
+#
+# Covers long itineraries, long budget tables and combined documents of many
+# itineraries and budgets, in English and Tamil. Peak memory is what
+# tracemalloc sees during one render. For combined documents it also counts
+# the embedded font files, against rendering every document separately.
+import argparse
+import json
+import re
+import time
+import tracemalloc
+
+import font_registry
+import pdf_export
+from benchmarks.pdf_rerun import sample_budget_table, sample_itinerary
+
+
+def render_once(render):
+    # (peak KiB, bytes) for one render, output read back and closed.
+    tracemalloc.start()
+    try:
+        output = render()
+        peak = tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+    data = output.read()
+    output.close()
+    return peak, data
+
+
+def timed(render, repeat):
+    # Timings without tracemalloc, which slows rendering down a lot.
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        render().close()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def result(render, repeat):
+    peak, data = render_once(render)
+    return {
+        "ms": timed(render, repeat) * 1000,
+        "peak_kib": peak,
+        "bytes": len(data),
+        "pages": len(re.findall(rb"/Type /Page\b", data)),
+        "font_files": data.count(b"/FontFile2"),
+    }
+
+
+def mixed_documents(count, languages):
+    table, notes, total_idx = sample_budget_table(20)
+    for i in range(count):
+        language = languages[i % len(languages)]
+        if i % 2:
+            yield "budget", language, (table, notes, total_idx), f"Budget {i}"
+        else:
+            yield "itinerary", language, sample_itinerary(7), f"Itinerary {i}"
+
+
+def run(languages, days, rows, documents, repeat):
+    results = {}
+    for language in languages:
+        font_registry.font_for_language(language)  # registration is not part of the measurement
+        for size in days:
+            text = sample_itinerary(size)
+            results[f"itinerary/{language}/{size}d"] = result(
+                lambda: pdf_export.generate_itinerary_pdf(text, language=language), repeat
+            )
+        for size in rows:
+            table, notes, total_idx = sample_budget_table(size)
+            results[f"budget/{language}/{size}rows"] = result(
+                lambda: pdf_export.generate_budget_pdf(table, notes, language=language, highlight_row_idx=total_idx),
+                repeat,
+            )
+    for count in documents:
+        combined = result(lambda: pdf_export.generate_combined_pdf(mixed_documents(count, languages)), repeat)
+        separate_fonts = 0
+        for document in mixed_documents(count, languages):
+            output = pdf_export.generate_combined_pdf([document])
+            separate_fonts += output.read().count(b"/FontFile2")
+            output.close()
+        combined["separate_font_files"] = separate_fonts
+        results[f"combined/{count}docs"] = combined
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--quick", action="store_true", help="smaller documents, one run each")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+    if args.quick:
+        results = run(["English", "Tamil"], [3, 30], [20, 200], [1, 10], repeat=1)
+    else:
+        results = run(["English", "Tamil"], [3, 30, 90, 365], [20, 200, 1000, 3000], [1, 10, 50, 200], repeat=3)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    print(f"{'document':<28}{'ms':>10}{'peak KiB':>12}{'KiB':>10}{'pages':>7}{'fonts':>7}")
+    for name, metrics in results.items():
+        fonts = f"{metrics['font_files']}"
+        if "separate_font_files" in metrics:
+            fonts += f"/{metrics['separate_font_files']}"
+        print(
+            f"{name:<28}{metrics['ms']:10.1f}{metrics['peak_kib']:12.0f}"
+            f"{metrics['bytes'] / 1024:10.1f}{metrics['pages']:7d}{fonts:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+# Offline benchmark suite. Every LLM call goes to the deterministic fake
+# backend, so results only reflect our own code and can be compared
+# between commits:
+#
+#   python -m benchmarks.run --output before.json
+#   ... change things ...
+#   python -m benchmarks.run --output after.json
+#   python -m benchmarks.compare before.json after.json
+import os
+import tempfile
+
+# Keep benchmark responses out of the real response cache.
+os.environ["ANBUPAYAN_CACHE_DIR"] = tempfile.mkdtemp(prefix="anbupayan-bench-")
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+from reportlab.pdfbase.ttfonts import TTFont
+
+import fake_model
+import font_registry
+import gazetteer
+import pdf_export
+from budget_math import check_budget
+from llm_client import configure_client
+from text_processing import clean_response_text, parse_budget_text
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(func, min_time=0.2, min_runs=3):
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < min_runs or time.perf_counter() - started < min_time:
+        t0 = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - t0)
+    return {
+        "median_ms": statistics.median(timings) * 1000,
+        "min_ms": min(timings) * 1000,
+        "runs": len(timings),
+    }
+
+
+def peak_memory_kib(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def itinerary_text(language, days, detail=1):
+    prompt = f"Create a detailed {days}-day itinerary\n- Destination: Madurai\n- Language: {language}\nBudget: ₹50000"
+    # Wrap in the stray markup Gemini sometimes adds, so cleaning has work to do.
+    return "**Here is your plan**\n```text\nignored\n```\n" + fake_model.fake_itinerary(prompt, detail) + "\n<br>\n\n"
+
+
+def budget_text(language, detail):
+    prompt = f"Plan a 7-day trip for 4 people plain text in {language} with NO Markdown. Compare the 50000"
+    return fake_model.fake_budget(prompt, detail)
+
+
+def bench_text(languages, sizes):
+    results = {}
+    for language in languages:
+        for days in sizes:
+            raw = itinerary_text(language, days)
+            timing = measure(lambda: clean_response_text(raw))
+            timing["mb_per_s"] = len(raw.encode("utf-8")) / 1e6 / (timing["median_ms"] / 1000)
+            results[f"text/clean/{language}/{days}d"] = timing
+        for detail in (1, 40):
+            cleaned = clean_response_text(budget_text(language, detail))
+            timing = measure(lambda: parse_budget_text(cleaned))
+            timing["rows"] = len(parse_budget_text(cleaned)[0])
+            results[f"text/parse_budget/{language}/{detail * 5}rows"] = timing
+            table, notes, total_idx = parse_budget_text(cleaned)
+            results[f"text/check_budget/{language}/{detail * 5}rows"] = measure(
+                lambda: check_budget(table, notes, total_idx, 3, 4, 50000)
+            )
+    return results
+
+
+def bench_pdf(languages, sizes):
+    results = {}
+    for language in languages:
+        font_registry.font_for_language(language)  # registration is measured separately
+        for days in sizes:
+            text = clean_response_text(itinerary_text(language, days))
+            render = lambda: pdf_export.generate_itinerary_pdf(text, language=language)
+            timing = measure(render, min_time=0.5)
+            timing["peak_kib"] = peak_memory_kib(render)
+            timing["bytes"] = len(render().getvalue())
+            results[f"pdf/itinerary/{language}/{days}d"] = timing
+        for detail in (1, 40):
+            table, notes, total_idx = parse_budget_text(clean_response_text(budget_text(language, detail)))
+            render = lambda: pdf_export.generate_budget_pdf(table, notes, language=language, highlight_row_idx=total_idx)
+            timing = measure(render, min_time=0.5)
+            timing["peak_kib"] = peak_memory_kib(render)
+            timing["bytes"] = len(render().getvalue())
+            results[f"pdf/budget/{language}/{len(table)}rows"] = timing
+    return results
+
+
+def bench_fonts():
+    results = {}
+    for font_name, file_name in font_registry.FONT_FILES.items():
+        path = os.path.join(font_registry.FONT_DIR, file_name)
+        results[f"fonts/parse/{font_name}"] = measure(lambda: TTFont(font_name, path), min_time=0.1)
+    font_registry.font_for_language("English")
+    results["fonts/lookup_registered"] = measure(lambda: font_registry.font_for_language("English"), min_time=0.05)
+    return results
+
+
+def bench_places():
+    gazetteer.get_gazetteer()  # loading the CSV is a one-off cost
+    return {
+        "places/resolve_exact": measure(lambda: gazetteer.resolve_place("Bangalore"), min_time=0.05),
+        "places/resolve_misspelt": measure(lambda: gazetteer.resolve_place("Kodaikanel"), min_time=0.05),
+        "places/search_prefix": measure(lambda: gazetteer.search_places("Ma"), min_time=0.05),
+        "places/nearest": measure(lambda: gazetteer.nearest_place(12.9, 77.6), min_time=0.05),
+    }
+
+
+def bench_reruns():
+    from streamlit.testing.v1 import AppTest
+
+    results = {}
+
+    def wait_for(at, name):
+        # Generation runs on the job queue; rerun until the page has the result.
+        while not at.session_state[name]:
+            time.sleep(0.05)
+            at.run()
+        return at
+
+    def home_session():
+        at = AppTest.from_file(os.path.join(ROOT, "Home.py"), default_timeout=60).run()
+        at.checkbox[0].set_value(False)
+        at.button[0].click().run()
+        return wait_for(at, "itinerary")
+
+    def budget_session():
+        at = AppTest.from_file(os.path.join(ROOT, "pages", "Budget.py"), default_timeout=60).run()
+        at.text_input("departure").input("Chennai")
+        at.text_input("location").input("Madurai")
+        at.checkbox[0].set_value(False)
+        at.button[0].click().run()
+        return wait_for(at, "base_budget")
+
+    results["rerun/home/first_run"] = measure(
+        lambda: AppTest.from_file(os.path.join(ROOT, "Home.py"), default_timeout=60).run(), min_time=0.5
+    )
+    at = home_session()
+    results["rerun/home/with_plan"] = measure(at.run, min_time=0.5)
+    results["rerun/home/suggestion_keystroke"] = measure(
+        lambda: at.text_area("suggestion_input").input(f"x{time.perf_counter()}").run(), min_time=0.5
+    )
+    at = budget_session()
+    results["rerun/budget/with_plan"] = measure(at.run, min_time=0.5)
+    results["rerun/budget/suggestion_keystroke"] = measure(
+        lambda: at.text_area("suggestion").input(f"x{time.perf_counter()}").run(), min_time=0.5
+    )
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite.")
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--quick", action="store_true", help="English and Tamil only, smaller documents")
+    parser.add_argument("--skip", action="append", default=[], choices=["text", "pdf", "fonts", "places", "rerun"])
+    parser.add_argument("--fake-latency", type=float, default=0.0, help="seconds per fake LLM call")
+    args = parser.parse_args()
+
+    configure_client(backend="fake", fake_latency=args.fake_latency)
+    languages = ["English", "Tamil"] if args.quick else list(font_registry.LANG_FONT_MAP)
+    sizes = [3, 10] if args.quick else [3, 30]
+
+    results = {}
+    if "text" not in args.skip:
+        results.update(bench_text(languages, sizes))
+    if "pdf" not in args.skip:
+        results.update(bench_pdf(languages, sizes))
+    if "fonts" not in args.skip:
+        results.update(bench_fonts())
+    if "places" not in args.skip:
+        results.update(bench_places())
+    if "rerun" not in args.skip:
+        results.update(bench_reruns())
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "quick": args.quick,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    for name, metrics in results.items():
+        print(f"{name:<48}{metrics['median_ms']:10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
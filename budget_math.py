@@ -0,0 +1,204 @@
+import math
+import re
+from dataclasses import dataclass, field
+
+FITS_NOTE = "Fits within budget"
+EXCEEDS_NOTE = "Exceeds budget — suggest cheaper alternatives"
+TOTAL_LABEL = "Total Estimated Cost"
+PEOPLE_PER_ROOM = 2
+
+_NUMBER = r"\d+(?:,\d+)*(?:\.\d+)?"
+_UNITS = r"lakhs?|lacs?|crores?|cr|k"
+_UNIT_VALUES = {"l": 100_000, "c": 10_000_000, "k": 1_000}
+_AMOUNT = re.compile(
+    rf"^({_NUMBER})\s*({_UNITS})?(?:\s*(?:-|–|—|to)\s*({_NUMBER})\s*({_UNITS})?)?$", re.IGNORECASE
+)
+_CURRENCY = re.compile(r"₹|\brs\b\.?|\binr\b|\brupees?\b|/-", re.IGNORECASE)
+_APPROX = re.compile(r"~|\b(?:approx(?:imately)?|about|around|roughly|up ?to|est(?:imated)?)\b\.?", re.IGNORECASE)
+_PER_PERSON = re.compile(r"(?:\bper\b|/)\s*(?:person|head|pax|adult)s?\b|\bpp\b|\beach\b", re.IGNORECASE)
+_NOTE = re.compile(r"\([^)]*\)|\[[^\]]*\]")
+_PRODUCT = re.compile(r"\s*[x×*]\s*")
+_FREE = re.compile(r"^(?:free|included|nil|none|no cost)\b", re.IGNORECASE)
+_VERDICT = re.compile(r"fits within (?:the )?budget|exceeds (?:the )?budget(?:\s*[—–-]+\s*suggest cheaper alternatives)?", re.IGNORECASE)
+_TOTAL = re.compile(r"^\s*total\b", re.IGNORECASE)
+_ACCOMMODATION = re.compile(r"accommodation|hotel|stay|lodging", re.IGNORECASE)
+_ROOMS = re.compile(r"(\d+)\s*rooms?\b", re.IGNORECASE)
+_NIGHTS = re.compile(r"(\d+)\s*nights?\b", re.IGNORECASE)
+_NIGHTLY_RATE = re.compile(rf"({_NUMBER})\s*(?:/|per)\s*(?:room\s*(?:/|per)\s*)?night", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class Amount:
+    low: float
+    high: float
+    per_person: bool = False
+
+    def times(self, factor):
+        return Amount(self.low * factor, self.high * factor)
+
+    def __add__(self, other):
+        return Amount(self.low + other.low, self.high + other.high)
+
+
+@dataclass
+class BudgetCheck:
+    table_data: list
+    notes: str
+    total: Amount
+    unparsed: list = field(default_factory=list)  # row indexes without a readable cost
+    changes: list = field(default_factory=list)
+
+
+def _value(number, unit):
+    value = float(number.replace(",", ""))
+    if unit:
+        value *= _UNIT_VALUES[unit[0].casefold()]
+    return value
+
+
+def _factor(text):
+    match = _AMOUNT.match(text.strip())
+    if not match:
+        return None
+    low_number, low_unit, high_number, high_unit = match.groups()
+    # "1-1.5 lakh": the unit after the range applies to both ends.
+    low = _value(low_number, low_unit or high_unit)
+    high = _value(high_number, high_unit) if high_number else low
+    return Amount(min(low, high), max(low, high))
+
+
+def parse_amount(text):
+    # Reads a cost cell such as "₹1,20,000", "5,000 - 8,000", "1.2 lakh",
+    # "₹1,500 x 2 = ₹3,000", "800 + 1,200" or "₹500 per person".
+    # Returns None when the cell has no amount that can be trusted.
+    text = _CURRENCY.sub(" ", text or "").strip()
+    if not text:
+        return None
+    if _FREE.match(text):
+        return Amount(0.0, 0.0)
+    # Notes go first: in "6,000 (1,500 per person)" the amount is the group
+    # total and the note only breaks it down. A note without a number, as in
+    # "1,500 (per person)", still marks the amount as per person.
+    notes = _NOTE.findall(text)
+    text = _NOTE.sub(" ", text)
+    per_person = bool(_PER_PERSON.search(text)) or any(
+        _PER_PERSON.search(note) and not re.search(r"\d", note) for note in notes
+    )
+    text = _PER_PERSON.sub(" ", _APPROX.sub(" ", text))
+    if "=" in text:
+        text = text.rsplit("=", 1)[1]
+    total = Amount(0.0, 0.0)
+    for part in text.split("+"):
+        amount = Amount(1.0, 1.0)
+        for factor_text in _PRODUCT.split(part.strip(" .,:;")):
+            factor = _factor(factor_text)
+            if factor is None:
+                return None
+            amount = Amount(amount.low * factor.low, amount.high * factor.high)
+        total += amount
+    return Amount(total.low, total.high, per_person)
+
+
+def format_inr(value):
+    # Indian digit grouping: 1,20,000.
+    digits = str(abs(int(round(value))))
+    head, tail = digits[:-3], digits[-3:]
+    groups = []
+    while len(head) > 2:
+        groups.insert(0, head[-2:])
+        head = head[:-2]
+    if head:
+        groups.insert(0, head)
+    return ("-" if value < 0 else "") + ",".join(groups + [tail])
+
+
+def format_amount(amount):
+    if round(amount.low) == round(amount.high):
+        return format_inr(amount.low)
+    return f"{format_inr(amount.low)} - {format_inr(amount.high)}"
+
+
+def _replace_count(pattern, text, value):
+    match = pattern.search(text)
+    return text[:match.start(1)] + str(value) + text[match.end(1):]
+
+
+def _accommodation(details, amount, rooms, nights):
+    # Rooms are ceil(people / 2) and nights equal the trip length, as the
+    # prompt says. A nightly rate in the details wins over the stated cost.
+    rate = _NIGHTLY_RATE.search(_CURRENCY.sub(" ", details))
+    stated_rooms = _ROOMS.search(details)
+    stated_nights = _NIGHTS.search(details)
+    if stated_rooms:
+        details = _replace_count(_ROOMS, details, rooms)
+    if stated_nights:
+        details = _replace_count(_NIGHTS, details, nights)
+    if rate:
+        return details, Amount(1.0, 1.0).times(_value(rate.group(1), None) * rooms * nights)
+    factor = 1.0
+    if stated_rooms and int(stated_rooms.group(1)):
+        factor *= rooms / int(stated_rooms.group(1))
+    if stated_nights and int(stated_nights.group(1)):
+        factor *= nights / int(stated_nights.group(1))
+    return details, amount.times(factor)
+
+
+def _is_total(table_data, index, total_row_idx):
+    # The parser only recognises an English total row; a translated one is
+    # still the last row with an empty Details column.
+    category, details, _ = table_data[index]
+    return index == total_row_idx or _TOTAL.match(category) or (
+        total_row_idx is None and index == len(table_data) - 1 and not details
+    )
+
+
+def check_budget(table_data, notes, total_row_idx, days, people, user_budget):
+    # Recomputes per-person costs, the accommodation row, the total and the
+    # verdict from the row amounts, whatever the model's own arithmetic said.
+    rows = [list(row) for row in table_data]
+    rooms = math.ceil(people / PEOPLE_PER_ROOM)
+    total = Amount(0.0, 0.0)
+    unparsed, changes = [], []
+    total_index = None
+    for index in range(1, len(rows)):
+        category, details, cost = rows[index]
+        if _is_total(rows, index, total_row_idx):
+            total_index = index
+            continue
+        amount = parse_amount(cost)
+        if amount is None:
+            unparsed.append(index)
+            continue
+        fixed = amount.times(people) if amount.per_person else amount
+        if _ACCOMMODATION.search(category):
+            details, fixed = _accommodation(details, fixed, rooms, days)
+        if fixed != amount:
+            changes.append(f"{category}: {cost} -> {format_amount(fixed)}")
+            rows[index] = [category, details, format_amount(fixed)]
+        total += fixed
+
+    total_cost = format_amount(total)
+    total_details = f"excluding {', '.join(rows[i][0] for i in unparsed)}" if unparsed else ""
+    if total_index is None:
+        rows.append([TOTAL_LABEL, total_details, total_cost])
+        changes.append(f"{TOTAL_LABEL}: added {total_cost}")
+    else:
+        stated = parse_amount(rows[total_index][2])
+        if stated is None or format_amount(stated) != total_cost:
+            changes.append(f"{TOTAL_LABEL}: {rows[total_index][2]} -> {total_cost}")
+        rows[total_index] = [rows[total_index][0], total_details or rows[total_index][1], total_cost]
+
+    verdict = FITS_NOTE if total.high <= user_budget else EXCEEDS_NOTE
+    stated_verdict = _VERDICT.search(notes or "")
+    if stated_verdict is None or stated_verdict.group(0).casefold().startswith("fits") != (verdict == FITS_NOTE):
+        changes.append(f"Verdict: {verdict}")
+    rest = _VERDICT.sub("", notes or "").strip(" .")
+    return BudgetCheck(rows, f"{verdict}. {rest}" if rest else verdict, total, unparsed, changes)
+
+
+def budget_text(table_data, notes):
+    # Text in the shape the model returns, so parse_budget_text reads it back.
+    lines = [" | ".join(row) for row in table_data]
+    if notes:
+        lines.append(notes)
+    return "\n".join(lines)
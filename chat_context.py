@@ -0,0 +1,151 @@
+import os
+import re
+
+MAX_HISTORY_TOKENS = int(os.getenv("ANBUPAYAN_CHAT_HISTORY_TOKENS", 1500))
+MAX_SUMMARY_TOKENS = int(os.getenv("ANBUPAYAN_CHAT_SUMMARY_TOKENS", 300))
+
+CHAT_RULES = """
+You are a friendly multilingual chatbot that helps users with trip planning and bookings.
+
+Rules:
+1. Always respond in {language}.
+2. Give short and precise answers in bullet points.
+3. Remember user details like budget, destination, travel dates, and preferences during the conversation.
+4. Only answer trip planning or user info questions. If the question is unrelated, reply: "Please ask relevant questions."
+5. Trip planning includes:
+   - Budget suggestions
+   - Destinations
+   - Flight booking
+   - Train booking
+   - Bus booking
+   - Hotels
+   - Places to visit
+   - Other travel services available on platforms like EaseMyTrip
+6. If you are not sure about something, say "I don’t know" instead of making things up.
+7. Give step-by-step guidance for bookings (like how to search for flights/trains/buses, best timing, tips, etc.).
+8. After every response, ask one relevant follow-up question to guide the user in planning their trip.
+"""
+
+_PLACE = r"([A-Z][\w.-]+(?:\s+[A-Z][\w.-]+){0,2})"
+_MONTH = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*"
+_FACT_PATTERNS = {
+    "budget": [
+        re.compile(r"(?:₹|\brs\.?|\binr)\s*([\d,]+(?:\.\d+)?\s*(?:k|lakhs?)?)", re.IGNORECASE),
+        re.compile(r"\bbudget\D{0,20}([\d,]+(?:\.\d+)?\s*(?:k|lakhs?)?)", re.IGNORECASE),
+    ],
+    "departure": [re.compile(r"\bfrom\s+" + _PLACE)],
+    "destination": [
+        re.compile(r"\b(?:trip to|going to|travel(?:l?ing)? to|visit(?:ing)?|to)\s+" + _PLACE),
+    ],
+    "dates": [
+        re.compile(r"\b(\d{1,2}(?:st|nd|rd|th)?\s+" + _MONTH + r"(?:\s*(?:-|to)\s*\d{1,2}(?:st|nd|rd|th)?(?:\s+" + _MONTH + r")?)?)", re.IGNORECASE),
+        re.compile(r"\b(" + _MONTH + r"\s+\d{1,2}(?:st|nd|rd|th)?)\b", re.IGNORECASE),
+        re.compile(r"\b(\d{1,2}[/-]\d{1,2}(?:[/-]\d{2,4})?)\b"),
+    ],
+    "travellers": [re.compile(r"\b(\d+)\s+(?:people|persons|adults|travell?ers|of us|members)\b", re.IGNORECASE)],
+    "preferences": [re.compile(r"\b(?:i prefer|i like|i love|interested in|we prefer|we like)\s+([^.?!\n]{3,60})", re.IGNORECASE)],
+}
+MAX_PREFERENCES = 3
+
+
+def estimate_tokens(text):
+    # Rough 4-characters-per-token estimate. Good enough to budget history
+    # without a count_tokens round trip; real counts come from usage metadata.
+    return max(1, len(text) // 4) if text else 0
+
+
+def extract_facts(text):
+    facts = {}
+    for name, patterns in _FACT_PATTERNS.items():
+        for pattern in patterns:
+            match = pattern.search(text)
+            if match:
+                facts[name] = match.group(1).strip(" ,")
+                break
+    return facts
+
+
+class ChatContext:
+    def __init__(self, max_history_tokens=MAX_HISTORY_TOKENS, max_summary_tokens=MAX_SUMMARY_TOKENS):
+        self.max_history_tokens = max_history_tokens
+        self.max_summary_tokens = max_summary_tokens
+        self.memory = {}
+        self.summary = []
+        self.turns = []
+        self.accounting = []
+
+    def to_dict(self):
+        return {"memory": self.memory, "summary": self.summary, "turns": self.turns, "accounting": self.accounting}
+
+    @classmethod
+    def from_dict(cls, data):
+        context = cls()
+        context.memory = data.get("memory", {})
+        context.summary = data.get("summary", [])
+        context.turns = [tuple(turn) for turn in data.get("turns", [])]
+        context.accounting = data.get("accounting", [])
+        return context
+
+    def remember(self, user_input):
+        for name, value in extract_facts(user_input).items():
+            if name == "preferences":
+                preferences = [p for p in self.memory.get(name, []) if p != value]
+                self.memory[name] = (preferences + [value])[-MAX_PREFERENCES:]
+            else:
+                self.memory[name] = value
+
+    def memory_text(self):
+        parts = []
+        for name, value in self.memory.items():
+            if isinstance(value, list):
+                value = ", ".join(value)
+            parts.append(f"{name}: {value}")
+        return "; ".join(parts)
+
+    def _history_tokens(self):
+        return sum(estimate_tokens(text) for _, text in self.turns)
+
+    def _trim(self):
+        # Drop the oldest exchanges once over budget, keeping a one-line
+        # gist of each user question so earlier topics are not lost.
+        while len(self.turns) > 2 and self._history_tokens() > self.max_history_tokens:
+            _, question = self.turns.pop(0)
+            self.turns.pop(0)
+            self.summary.append(" ".join(question.split())[:80])
+        while self.summary and estimate_tokens(" | ".join(self.summary)) > self.max_summary_tokens:
+            self.summary.pop(0)
+
+    def build_contents(self, user_input):
+        self.remember(user_input)
+        contents = []
+        preamble = []
+        if self.memory:
+            preamble.append(f"Known user details: {self.memory_text()}")
+        if self.summary:
+            preamble.append("Earlier questions: " + " | ".join(self.summary))
+        if preamble:
+            contents.append({"role": "user", "parts": ["\n".join(preamble)]})
+            contents.append({"role": "model", "parts": ["Noted."]})
+        for role, text in self.turns:
+            contents.append({"role": role, "parts": [text]})
+        contents.append({"role": "user", "parts": [user_input]})
+        return contents
+
+    def record(self, user_input, reply, contents=None, usage=None, cached=False):
+        sent = contents or []
+        estimated_prompt = sum(estimate_tokens(part) for content in sent for part in content["parts"])
+        entry = {
+            "turn": len(self.accounting) + 1,
+            "estimated_prompt_tokens": estimated_prompt,
+            "estimated_response_tokens": estimate_tokens(reply),
+            "history_turns": len(self.turns),
+            "cached": cached,
+        }
+        if usage is not None:
+            entry["prompt_tokens"] = getattr(usage, "prompt_token_count", None)
+            entry["response_tokens"] = getattr(usage, "candidates_token_count", None)
+        self.accounting.append(entry)
+        self.turns.append(("user", user_input))
+        self.turns.append(("model", reply))
+        self._trim()
+        return entry
@@ -0,0 +1,155 @@
+import hashlib
+import re
+import time
+import types
+
+# Deterministic stand-in for genai.GenerativeModel. It understands just
+# enough of the itinerary and budget prompts to produce output with the
+# same shape as Gemini's, so the app and the batch tools run offline.
+
+
+def _seed(prompt):
+    return int(hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8], 16)
+
+
+def _find(pattern, prompt, default):
+    match = re.search(pattern, prompt)
+    return match.group(1).strip() if match else default
+
+
+# Day word, Morning/Afternoon/Evening labels and a sample activity in each
+# supported language, so fake output exercises every script and font.
+PHRASES = {
+    "English": ("Day", ("Morning", "Afternoon", "Evening"), "Visit the Old Fort and Central Market"),
+    "Hindi": ("दिन", ("सुबह", "दोपहर", "शाम"), "पुराने किले और स्थानीय बाज़ार की सैर"),
+    "Bengali": ("দিন", ("সকাল", "দুপুর", "সন্ধ্যা"), "পুরনো দুর্গ ও স্থানীয় বাজার ঘুরে দেখুন"),
+    "Telugu": ("రోజు", ("ఉదయం", "మధ్యాహ్నం", "సాయంత్రం"), "పాత కోట మరియు స్థానిక మార్కెట్ సందర్శన"),
+    "Marathi": ("दिवस", ("सकाळ", "दुपार", "संध्याकाळ"), "जुना किल्ला आणि स्थानिक बाजार पहा"),
+    "Tamil": ("நாள்", ("காலை", "மதியம்", "மாலை"), "பழைய கோட்டை மற்றும் உள்ளூர் சந்தை பார்வை"),
+    "Gujarati": ("દિવસ", ("સવાર", "બપોર", "સાંજ"), "જૂનો કિલ્લો અને સ્થાનિક બજારની મુલાકાત"),
+    "Kannada": ("ದಿನ", ("ಬೆಳಿಗ್ಗೆ", "ಮಧ್ಯಾಹ್ನ", "ಸಂಜೆ"), "ಹಳೆಯ ಕೋಟೆ ಮತ್ತು ಸ್ಥಳೀಯ ಮಾರುಕಟ್ಟೆ ಭೇಟಿ"),
+    "Malayalam": ("ദിവസം", ("രാവിലെ", "ഉച്ചയ്ക്ക്", "വൈകുന്നേരം"), "പഴയ കോട്ടയും പ്രാദേശിക ചന്തയും സന്ദർശിക്കുക"),
+    "Punjabi": ("ਦਿਨ", ("ਸਵੇਰ", "ਦੁਪਹਿਰ", "ਸ਼ਾਮ"), "ਪੁਰਾਣਾ ਕਿਲ੍ਹਾ ਅਤੇ ਸਥਾਨਕ ਬਾਜ਼ਾਰ ਵੇਖੋ"),
+    "Santali": ("ᱫᱤᱱ", ("ᱥᱮᱛᱟᱜ", "ᱛᱟᱞᱟ ᱢᱟᱦᱟᱸ", "ᱟᱭᱩᱵ"), "ᱯᱩᱨᱟᱱ ᱜᱟᱲ ᱟᱨ ᱦᱟᱴ ᱧᱮᱞ"),
+}
+
+
+def fake_itinerary(prompt, detail=1):
+    days = int(_find(r"(\d+)-day", prompt, "3"))
+    destination = _find(r"- Destination: (.+)", prompt, "the city")
+    language = _find(r"- Language: (.+)", prompt, "English")
+    day_word, slots, activity = PHRASES.get(language, PHRASES["English"])
+    seed = _seed(prompt)
+    lines = []
+    total = 0
+    for day in range(1, days + 1):
+        cost = 1500 + (seed + day * 97) % 2500
+        total += cost
+        lines.append(f"{day_word} {day}:")
+        for slot, share in zip(slots, (cost // 5, cost // 3, cost - cost // 5 - cost // 3)):
+            lines.append(f"{slot}: {destination} - " + ", ".join([activity] * detail) + f" (₹{share}).")
+    lines.append("Category | Estimated Cost (INR)")
+    lines.append(f"Travel | {total // 4}")
+    lines.append(f"Accommodation | {total // 4}")
+    lines.append(f"Food | {total // 4}")
+    lines.append(f"Activities | {total - 3 * (total // 4)}")
+    lines.append(f"Total Estimated Cost | {total}")
+    budget = int(_find(r"Budget: ₹(\d+)", prompt, "0"))
+    lines.append("Fits within budget" if total <= budget else "Exceeds budget")
+    return "\n".join(lines)
+
+
+def fake_budget(prompt, detail=1):
+    days = int(_find(r"Plan a (\d+)-day", prompt, "3"))
+    people = int(_find(r"for (\d+) people", prompt, "1"))
+    user_budget = int(_find(r"Compare the (\d+)", prompt, "0"))
+    language = _find(r"plain text in (\S+) with", prompt, "English")
+    activity = PHRASES.get(language, PHRASES["English"])[2]
+    seed = _seed(prompt)
+    rooms = -(-people // 2)
+    rows = [
+        ("Transport", f"Return train tickets for {people}", 900 * people),
+        ("Accommodation", f"Hotel Residency, {rooms} room(s) x {days} night(s)", (2000 + seed % 500) * rooms * days),
+        ("Food", f"Local restaurants, {days} day(s)", 600 * people * days),
+        ("Attractions/Activities", activity, 300 * people * days),
+        ("Miscellaneous", "Local transport and tips", 250 * days),
+    ]
+    # Larger detail values itemise every category, giving longer tables.
+    rows = [
+        (category, details if detail == 1 else f"{details} ({i + 1}/{detail})", cost // detail)
+        for category, details, cost in rows
+        for i in range(detail)
+    ]
+    total = sum(cost for _, _, cost in rows)
+    lines = ["Category | Details (hotel/restaurant/attraction names and breakdown) | Estimated Cost (INR)"]
+    lines += [f"{category} | {details} | {cost:,}" for category, details, cost in rows]
+    lines.append(f"Total Estimated Cost |  | {total}")
+    lines.append("Fits within budget" if total <= user_budget else "Exceeds budget — suggest cheaper alternatives")
+    return "\n".join(lines)
+
+
+def fake_day_edit(prompt):
+    suggestion = _find(r"User suggestion: (.+)", prompt, "")
+    days = prompt.split("Days to rewrite:", 1)[1].split("Output Rules:", 1)[0]
+    lines = [line.strip() for line in days.strip().splitlines()]
+    return "\n".join(lines + [f"Note: updated for \"{suggestion}\"."] if lines else [])
+
+
+def fake_summary_update(prompt):
+    summary = prompt.split("Current cost summary:", 1)[1].split("Changed days before:", 1)[0]
+    return "\n".join(line.strip() for line in summary.strip().splitlines())
+
+
+def fake_row_prices(prompt):
+    rows = prompt.split("Rows to price:", 1)[1].split("Reply with", 1)[0]
+    categories = [line.split("|")[0].strip() for line in rows.strip().splitlines() if line.strip()]
+    return "\n".join(f"{category} | {500 + _seed(category) % 1500}" for category in categories)
+
+
+def fake_reply(prompt, detail=1):
+    if "Rows to price:" in prompt:
+        return fake_row_prices(prompt)
+    if "Days to rewrite:" in prompt:
+        return fake_day_edit(prompt)
+    if "Current cost summary:" in prompt:
+        return fake_summary_update(prompt)
+    if "travel budget planner" in prompt:
+        return fake_budget(prompt, detail)
+    if "travel planner" in prompt:
+        return fake_itinerary(prompt, detail)
+    return "- I can help you plan that trip.\n- Where would you like to go?"
+
+
+def _prompt_text(contents):
+    if isinstance(contents, str):
+        return contents
+    parts = []
+    for content in contents:
+        if isinstance(content, dict):
+            parts.extend(str(part) for part in content.get("parts", []))
+        else:
+            parts.append(str(content))
+    return "\n".join(parts)
+
+
+class FakeModel:
+    def __init__(self, model_name="fake", latency=0.0, chunk_size=64, detail=1):
+        self.model_name = model_name
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.detail = detail
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        text = fake_reply(_prompt_text(contents), self.detail)
+        if not stream:
+            if self.latency:
+                time.sleep(self.latency)
+            return types.SimpleNamespace(text=text, usage_metadata=None)
+        return self._stream(text)
+
+    def _stream(self, text):
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        for chunk in chunks:
+            if self.latency:
+                time.sleep(self.latency / len(chunks))
+            yield types.SimpleNamespace(text=chunk, usage_metadata=None)
@@ -0,0 +1,82 @@
+import os
+import threading
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+FONT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts")
+DEFAULT_FONT = "NotoSans"
+
+FONT_FILES = {
+    "NotoSans": "NotoSans-Regular.ttf",
+    "NotoSansDevanagari": "NotoSansDevanagari-Regular.ttf",
+    "NotoSansBengali": "NotoSansBengali-Regular.ttf",
+    "NotoSansTelugu": "NotoSansTelugu-Regular.ttf",
+    "NotoSansTamil": "NotoSansTamil-Regular.ttf",
+    "NotoSansGujarati": "NotoSansGujarati-Regular.ttf",
+    "NotoSansKannada": "NotoSansKannada-Regular.ttf",
+    "NotoSansMalayalam": "NotoSansMalayalam-Regular.ttf",
+    "NotoSansGurmukhi": "NotoSansGurmukhi-Regular.ttf",
+    "NotoSansOlChiki": "NotoSansOlChiki-Regular.ttf",
+}
+
+LANG_FONT_MAP = {
+    "English": "NotoSans",
+    "Hindi": "NotoSansDevanagari",
+    "Bengali": "NotoSansBengali",
+    "Telugu": "NotoSansTelugu",
+    "Marathi": "NotoSansDevanagari",
+    "Tamil": "NotoSansTamil",
+    "Gujarati": "NotoSansGujarati",
+    "Kannada": "NotoSansKannada",
+    "Malayalam": "NotoSansMalayalam",
+    "Punjabi": "NotoSansGurmukhi",
+    "Santali": "NotoSansOlChiki",
+}
+
+# Parsed fonts live for the whole process, so Streamlit reruns and other
+# sessions reuse them instead of reading the TTF files again.
+_fonts = {}
+_lock = threading.Lock()
+
+
+def register_font(font_name):
+    font = _fonts.get(font_name)
+    if font is not None:
+        return font
+    with _lock:
+        font = _fonts.get(font_name)
+        if font is None:
+            font = TTFont(font_name, os.path.join(FONT_DIR, FONT_FILES[font_name]))
+            pdfmetrics.registerFont(font)
+            _fonts[font_name] = font
+    return font
+
+
+def font_for_language(language):
+    font_name = LANG_FONT_MAP.get(language, DEFAULT_FONT)
+    register_font(font_name)
+    return font_name
+
+
+def registered_fonts():
+    return sorted(_fonts)
+
+
+def warm_up(languages=None, background=False):
+    font_names = {LANG_FONT_MAP.get(language, DEFAULT_FONT) for language in (languages or LANG_FONT_MAP)}
+
+    def load():
+        for font_name in sorted(font_names):
+            register_font(font_name)
+
+    if not background:
+        load()
+        return None
+    thread = threading.Thread(target=load, name="font-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+if os.getenv("ANBUPAYAN_FONT_WARMUP", "").lower() in ("1", "true", "yes"):
+    warm_up(background=True)
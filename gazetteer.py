@@ -0,0 +1,187 @@
+import bisect
+import csv
+import difflib
+import math
+import os
+import re
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+
+import numpy as np
+
+GAZETTEER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "india_places.csv")
+# Extra CSV files with the same columns (name,state,lat,lon,aliases), separated
+# by os.pathsep, for towns the bundled list does not cover.
+EXTRA_FILES = [path for path in os.getenv("ANBUPAYAN_GAZETTEER_FILES", "").split(os.pathsep) if path]
+EARTH_RADIUS_KM = 6371.0
+FUZZY_CUTOFF = 0.75
+# A misspelling this close to exactly one known name is taken as that place.
+AUTOCORRECT_CUTOFF = 0.88
+
+_NON_NAME = re.compile(r"[^\w\s&]+")
+
+
+class PlaceError(ValueError):
+    def __init__(self, message, suggestions=()):
+        super().__init__(message)
+        self.suggestions = list(suggestions)
+
+
+class UnknownPlaceError(PlaceError):
+    # Not in the gazetteer at all. The list is not complete (Auroville,
+    # small hill stations, anywhere outside India), so callers plan the
+    # trip anyway and only drop what needs coordinates.
+    pass
+
+
+@dataclass(frozen=True)
+class Place:
+    name: str
+    state: str
+    lat: float
+    lon: float
+
+    @property
+    def is_region(self):
+        # States and union territories are listed too, since people plan
+        # trips "to Kerala" or "to Ladakh".
+        return self.name == self.state
+
+    @property
+    def label(self):
+        return self.name if self.is_region else f"{self.name}, {self.state}"
+
+
+def normalize(name):
+    return " ".join(_NON_NAME.sub(" ", name.casefold()).split())
+
+
+def distance_km(origin, target):
+    lat1, lon1, lat2, lon2 = map(math.radians, (origin.lat, origin.lon, target.lat, target.lon))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class Gazetteer:
+    def __init__(self, paths):
+        self.places = []
+        self._by_key = defaultdict(list)
+        for path in paths:
+            self._load(path)
+        # Sorted keys give prefix search with bisect; towns (not regions)
+        # get a coordinate matrix for nearest-place lookups.
+        self._keys = sorted(self._by_key)
+        self._longest = max((len(key.split()) for key in self._keys), default=0)
+        self._towns = [place for place in self.places if not place.is_region]
+        self._coords = np.radians(np.array([[place.lat, place.lon] for place in self._towns]))
+
+    def _load(self, path):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                place = Place(row["name"].strip(), row["state"].strip(), float(row["lat"]), float(row["lon"]))
+                self.places.append(place)
+                for name in [place.name] + (row.get("aliases") or "").split(";"):
+                    key = normalize(name)
+                    if key and place not in self._by_key[key]:
+                        self._by_key[key].append(place)
+
+    def lookup(self, query):
+        # Exact name or alias; "Aurangabad, Bihar" narrows by state.
+        name, _, state = query.partition(",")
+        matches = self._by_key.get(normalize(name), [])
+        state_key = normalize(state)
+        if state_key and state_key != "india":
+            matches = [place for place in matches if normalize(place.state) == state_key]
+        return matches
+
+    def mentions(self, text):
+        # (word position, place) for every known name in free text, in any
+        # case. Longer names win, so "Navi Mumbai" is not also "Mumbai". An
+        # ambiguous name comes back as its key.
+        words = normalize(text).split()
+        found, index = [], 0
+        while index < len(words):
+            for size in range(min(self._longest, len(words) - index), 0, -1):
+                key = " ".join(words[index:index + size])
+                if key in self._by_key:
+                    places = self._by_key[key]
+                    found.append((index, places[0].label if len(places) == 1 else key))
+                    index += size
+                    break
+            else:
+                index += 1
+        return found
+
+    def search(self, query, limit=5):
+        # Prefix matches first, for autocomplete, then close spellings.
+        key = normalize(query.partition(",")[0])
+        if not key:
+            return []
+        keys = []
+        for candidate in self._keys[bisect.bisect_left(self._keys, key):]:
+            if not candidate.startswith(key) or len(keys) >= limit:
+                break
+            keys.append(candidate)
+        keys += difflib.get_close_matches(key, self._keys, n=limit, cutoff=FUZZY_CUTOFF)
+        found = []
+        for candidate in keys:
+            for place in self._by_key[candidate]:
+                if place not in found:
+                    found.append(place)
+        return found[:limit]
+
+    def nearest(self, lat, lon, limit=1):
+        lat, lon = math.radians(lat), math.radians(lon)
+        a = (
+            np.sin((self._coords[:, 0] - lat) / 2) ** 2
+            + math.cos(lat) * np.cos(self._coords[:, 0]) * np.sin((self._coords[:, 1] - lon) / 2) ** 2
+        )
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+        return [(self._towns[i], float(distances[i])) for i in np.argsort(distances)[:limit]]
+
+    def resolve(self, query, role="place"):
+        if not query or not query.strip():
+            raise PlaceError(f"Please enter a {role}.")
+        matches = self.lookup(query)
+        if len(matches) == 1:
+            return matches[0]
+        if matches:
+            options = "; ".join(place.label for place in matches)
+            raise PlaceError(
+                f"'{query}' matches several places ({options}). Add the state, e.g. '{matches[0].label}'.", matches
+            )
+        close = difflib.get_close_matches(normalize(query.partition(",")[0]), self._keys, n=2, cutoff=AUTOCORRECT_CUTOFF)
+        if len(close) == 1 and len(self._by_key[close[0]]) == 1:
+            return self._by_key[close[0]][0]
+        suggestions = self.search(query)
+        hint = f" Did you mean {' or '.join(place.label for place in suggestions[:3])}?" if suggestions else ""
+        raise UnknownPlaceError(f"Unknown {role} '{query}'.{hint}", suggestions)
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer():
+    global _gazetteer
+    with _gazetteer_lock:
+        if _gazetteer is None:
+            _gazetteer = Gazetteer([GAZETTEER_FILE] + EXTRA_FILES)
+        return _gazetteer
+
+
+def resolve_place(query, role="place"):
+    return get_gazetteer().resolve(query, role)
+
+
+def places_mentioned(text):
+    return get_gazetteer().mentions(text)
+
+
+def search_places(query, limit=5):
+    return get_gazetteer().search(query, limit)
+
+
+def nearest_place(lat, lon):
+    return get_gazetteer().nearest(lat, lon)[0]
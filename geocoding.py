@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from geopy.exc import GeopyError
+from geopy.geocoders import Nominatim
+
+from metrics import span
+from rate_limit import TokenBucket
+from response_cache import ResponseCache, make_key
+
+# Nominatim's public instance allows one request per second. Point
+# ANBUPAYAN_GEOCODER_URL at a local stand-in (stub_server.py serves one) or a
+# self-hosted Nominatim to test or to go faster.
+GEOCODER_URL = os.getenv("ANBUPAYAN_GEOCODER_URL", "https://nominatim.openstreetmap.org")
+GEOCODER_RATE = float(os.getenv("ANBUPAYAN_GEOCODER_RATE", 1.0))
+GEOCODER_WORKERS = int(os.getenv("ANBUPAYAN_GEOCODER_WORKERS", 4))
+GEOCODER_TIMEOUT = float(os.getenv("ANBUPAYAN_GEOCODER_TIMEOUT", 10))
+GEOCODE_TTL = int(os.getenv("ANBUPAYAN_GEOCODE_TTL", 30 * 24 * 3600))
+# Names Nominatim does not know are cached too, but retried sooner.
+GEOCODE_MISS_TTL = int(os.getenv("ANBUPAYAN_GEOCODE_MISS_TTL", 24 * 3600))
+USER_AGENT = "AnbuPayanAI"
+
+
+class Geocoder:
+    def __init__(self, url=GEOCODER_URL, rate=GEOCODER_RATE, workers=GEOCODER_WORKERS, cache=None, timeout=GEOCODER_TIMEOUT):
+        parts = urlsplit(url)
+        self._nominatim = Nominatim(
+            user_agent=USER_AGENT, domain=parts.netloc + parts.path.rstrip("/"), scheme=parts.scheme, timeout=timeout
+        )
+        self.cache = cache or ResponseCache("geocodes", ttl=GEOCODE_TTL)
+        self._bucket = TokenBucket(rate)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="geocoder")
+        self._pending = {}
+        # Re-entrant: a future that is already done runs its callback
+        # immediately, while _submit still holds the lock.
+        self._lock = threading.RLock()
+
+    def _fetch(self, query):
+        self._bucket.acquire()
+        try:
+            location = self._nominatim.geocode(query, country_codes="in")
+        except GeopyError:
+            return None, False  # not cached, so the next render tries again
+        if location is None:
+            return None, True
+        return {"lat": location.latitude, "lon": location.longitude, "address": location.address}, True
+
+    def _submit(self, key, query):
+        # Sessions asking for the same name at the same time share one
+        # upstream request.
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                future = self._pool.submit(self._fetch, query)
+                self._pending[key] = future
+                future.add_done_callback(lambda _: self._forget(key))
+            return future
+
+    def _forget(self, key):
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def geocode_many(self, names, near=""):
+        # Returns {name: {"lat", "lon", "address"}} for the names that could
+        # be located. Cached names cost one SQLite query in total; the rest
+        # are looked up concurrently under the rate limit.
+        keys = {name: make_key(kind="geocode", name=name, near=near) for name in dict.fromkeys(names)}
+        with span("geocode") as attributes:
+            cached = self.cache.get_many(keys.values())
+            futures = {
+                name: self._submit(key, f"{name}, {near}" if near else name)
+                for name, key in keys.items() if key not in cached
+            }
+            attributes.update(names=len(keys), cached=len(keys) - len(futures), fetched=len(futures))
+
+            found, misses = {}, {}
+            for name, future in futures.items():
+                result, cacheable = future.result()
+                if result is not None:
+                    found[keys[name]] = json.dumps(result)
+                elif cacheable:
+                    misses[keys[name]] = "null"
+            self.cache.set_many(found)
+            self.cache.set_many(misses, ttl=GEOCODE_MISS_TTL)
+
+        results = {}
+        for name, key in keys.items():
+            value = cached.get(key) or found.get(key)
+            if value and value != "null":
+                results[name] = json.loads(value)
+        return results
+
+
+_geocoder = None
+_geocoder_lock = threading.Lock()
+
+
+def get_geocoder():
+    global _geocoder
+    with _geocoder_lock:
+        if _geocoder is None:
+            _geocoder = Geocoder()
+        return _geocoder
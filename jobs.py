@@ -0,0 +1,118 @@
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import count, observe
+from response_cache import make_key
+
+JOB_WORKERS = int(os.getenv("ANBUPAYAN_JOB_WORKERS", 8))
+
+
+def qualified_name(func):
+    if func is None:
+        return ""
+    return f"{getattr(func, '__module__', '')}.{getattr(func, '__qualname__', type(func).__qualname__)}"
+
+
+def job_key(kind, args=(), kwargs=None, func=None, finish=None):
+    # func and finish are part of the key when given, so two different
+    # callables with the same kind and arguments never share a job.
+    return make_key(
+        kind=kind, args=args, kwargs=sorted((kwargs or {}).items()),
+        func=qualified_name(func), finish=qualified_name(finish),
+    )
+
+
+class Job:
+    # Stored in st.session_state, so it outlives the rerun that submitted
+    # it; the page polls status and, for streamed jobs, the pieces so far.
+
+    def __init__(self, key, kind):
+        self.key = key
+        self.kind = kind
+        self.status = "pending"
+        self.pieces = []
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def text(self):
+        return "".join(self.pieces)
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+
+class JobQueue:
+    def __init__(self, workers=JOB_WORKERS):
+        self.workers = workers
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jobs")
+        self._running = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, func, *args, stream=False, finish=None, **kwargs):
+        # Identical requests that are still in flight, from any session,
+        # get the same Job and so share one upstream call. With stream=True
+        # func returns an iterable of text pieces and the result is their join.
+        # finish, if given, is called as finish(result, *args, **kwargs) and
+        # its return value becomes the result.
+        key = job_key(kind, args, kwargs, func, finish)
+        with self._lock:
+            job = self._running.get(key)
+            if job is not None:
+                count("jobs_coalesced", kind=kind)
+                return job
+            job = Job(key, kind)
+            self._running[key] = job
+        count("jobs_submitted", kind=kind)
+        # Run in a copy of the caller's context so metrics keep the page label.
+        self._pool.submit(contextvars.copy_context().run, self._run, job, func, args, kwargs, stream, finish)
+        return job
+
+    def _run(self, job, func, args, kwargs, stream, finish):
+        started = time.time()
+        observe("job_wait", started - job.submitted_at, kind=job.kind)
+        job.status = "running"
+        try:
+            if stream:
+                for piece in func(*args, **kwargs):
+                    job.pieces.append(piece)
+                job.result = job.text()
+            else:
+                job.result = func(*args, **kwargs)
+            if finish is not None:
+                job.result = finish(job.result, *args, **kwargs)
+            job.status = "done"
+        except Exception as e:
+            job.error = e
+            job.status = "error"
+        finally:
+            job.finished_at = time.time()
+            observe("job", job.finished_at - started, {"failed": job.status == "error"}, kind=job.kind)
+            with self._lock:
+                self._running.pop(job.key, None)
+            job._done.set()
+
+    def running(self):
+        with self._lock:
+            return len(self._running)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
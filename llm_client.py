@@ -0,0 +1,246 @@
+import http.client
+import json
+import os
+import random
+import threading
+import time
+import types
+from urllib.parse import urlsplit
+
+from dotenv import load_dotenv
+
+from metrics import annotate
+
+load_dotenv()
+
+DEFAULT_MODEL = os.getenv("ANBUPAYAN_MODEL", "gemini-2.0-flash-001")
+# "gemini", "fake", or the URL of a stub server such as http://127.0.0.1:8765
+BACKEND = os.getenv("ANBUPAYAN_LLM_BACKEND", "gemini")
+TIMEOUT = float(os.getenv("ANBUPAYAN_LLM_TIMEOUT", 60))
+RETRIES = int(os.getenv("ANBUPAYAN_LLM_RETRIES", 3))
+BACKOFF = float(os.getenv("ANBUPAYAN_LLM_BACKOFF", 1.0))
+MAX_CONCURRENCY = int(os.getenv("ANBUPAYAN_LLM_MAX_CONCURRENCY", 8))
+
+
+class TransientError(Exception):
+    pass
+
+
+def is_transient(error):
+    if isinstance(error, (TransientError, TimeoutError, ConnectionError)):
+        return True
+    try:
+        from google.api_core import exceptions as api_exceptions
+    except ImportError:
+        return False
+    return isinstance(error, (
+        api_exceptions.TooManyRequests,
+        api_exceptions.ResourceExhausted,
+        api_exceptions.ServiceUnavailable,
+        api_exceptions.InternalServerError,
+        api_exceptions.DeadlineExceeded,
+    ))
+
+
+class GeminiBackend:
+    def __init__(self):
+        import google.generativeai as genai
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+        self._genai = genai
+
+    def create_model(self, model_name, system_instruction=None):
+        return self._genai.GenerativeModel(model_name, system_instruction=system_instruction)
+
+    def generate(self, model, contents, stream, timeout):
+        return model.generate_content(contents, stream=stream, request_options={"timeout": timeout})
+
+
+class FakeBackend:
+    def __init__(self, latency=0.0, detail=1):
+        self.latency = latency
+        self.detail = detail
+
+    def create_model(self, model_name, system_instruction=None):
+        from fake_model import FakeModel
+        return FakeModel(model_name=f"fake/{model_name}", latency=self.latency, detail=self.detail)
+
+    def generate(self, model, contents, stream, timeout):
+        return model.generate_content(contents, stream=stream)
+
+
+class HttpBackend:
+    # Talks to stub_server.py (or anything speaking the same JSON protocol).
+    # Each thread keeps one persistent connection.
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self._local = threading.local()
+
+    def create_model(self, model_name, system_instruction=None):
+        return types.SimpleNamespace(model_name=f"stub/{model_name}", name=model_name, system_instruction=system_instruction)
+
+    def _connection(self, timeout):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+            self._local.conn = conn
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn
+
+    def _post(self, body, timeout):
+        conn = self._connection(timeout)
+        try:
+            conn.request("POST", "/generate", body=body, headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            self._local.conn = None
+            raise ConnectionError(str(e)) from e
+        if response.status == 429 or response.status >= 500:
+            response.read()
+            raise TransientError(f"stub server returned {response.status}")
+        if response.status != 200:
+            raise RuntimeError(f"stub server returned {response.status}: {response.read()[:200]!r}")
+        return response
+
+    def generate(self, model, contents, stream, timeout):
+        body = json.dumps({
+            "model": model.name,
+            "system_instruction": model.system_instruction,
+            "contents": contents,
+            "stream": stream,
+        })
+        response = self._post(body, timeout)
+        if not stream:
+            payload = json.loads(response.read())
+            return types.SimpleNamespace(text=payload["text"], usage_metadata=None)
+        return self._chunks(response)
+
+    def _chunks(self, response):
+        try:
+            for line in iter(response.readline, b""):
+                if line.strip():
+                    yield types.SimpleNamespace(text=json.loads(line)["text"], usage_metadata=None)
+        finally:
+            # A stream abandoned halfway leaves unread data on the socket,
+            # so that connection cannot be reused.
+            if not response.isclosed():
+                response.close()
+                conn = getattr(self._local, "conn", None)
+                if conn is not None:
+                    conn.close()
+                self._local.conn = None
+
+
+def create_backend(backend, fake_latency=0.0, fake_detail=1):
+    if backend == "gemini":
+        return GeminiBackend()
+    if backend == "fake":
+        return FakeBackend(latency=fake_latency, detail=fake_detail)
+    if backend.startswith("http://"):
+        return HttpBackend(backend)
+    raise ValueError(f"Unknown LLM backend: {backend}")
+
+
+class ManagedModel:
+    # Drop-in for GenerativeModel.generate_content that enforces the
+    # client's deadline, retry policy and concurrency cap.
+
+    def __init__(self, client, model):
+        self.client = client
+        self.model = model
+        self.model_name = model.model_name
+
+    def generate_content(self, contents, stream=False):
+        if stream:
+            return self.client.stream(self.model, contents)
+        return self.client.call(self.model, contents)
+
+
+class LLMClient:
+    def __init__(self, backend, timeout=TIMEOUT, retries=RETRIES, backoff=BACKOFF, max_concurrency=MAX_CONCURRENCY):
+        self.backend = backend
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def model(self, model_name=DEFAULT_MODEL, system_instruction=None):
+        key = (model_name, system_instruction)
+        with self._lock:
+            if key not in self._models:
+                self._models[key] = ManagedModel(self, self.backend.create_model(model_name, system_instruction))
+            return self._models[key]
+
+    def _acquire(self, deadline):
+        if not self._slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            raise TimeoutError("Timed out waiting for a free LLM request slot")
+
+    def _sleep_before_retry(self, attempt, deadline):
+        delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+        if time.monotonic() + delay >= deadline:
+            return False
+        time.sleep(delay)
+        return True
+
+    def call(self, model, contents):
+        deadline = time.monotonic() + self.timeout
+        for attempt in range(self.retries + 1):
+            self._acquire(deadline)
+            try:
+                response = self.backend.generate(model, contents, False, max(0.1, deadline - time.monotonic()))
+                annotate(retries=attempt)
+                return response
+            except Exception as e:
+                error = e
+            finally:
+                self._slots.release()
+            if attempt == self.retries or not is_transient(error) or not self._sleep_before_retry(attempt, deadline):
+                raise error
+
+    def stream(self, model, contents):
+        # Retries only happen before the first chunk; once text has been
+        # shown to the user a failure is raised instead of restarting.
+        deadline = time.monotonic() + self.timeout
+        for attempt in range(self.retries + 1):
+            self._acquire(deadline)
+            started = False
+            try:
+                for chunk in self.backend.generate(model, contents, True, max(0.1, deadline - time.monotonic())):
+                    started = True
+                    yield chunk
+                annotate(retries=attempt)
+                return
+            except Exception as e:
+                error = e
+            finally:
+                self._slots.release()
+            if started or attempt == self.retries or not is_transient(error) or not self._sleep_before_retry(attempt, deadline):
+                raise error
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def configure_client(backend=None, fake_latency=0.0, fake_detail=1, **options):
+    # Replaces the process-wide client, e.g. to point the batch CLI or a
+    # load test at the fake backend or a stub server.
+    global _client
+    with _client_lock:
+        _client = LLMClient(create_backend(backend or BACKEND, fake_latency, fake_detail), **options)
+        return _client
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient(create_backend(BACKEND))
+        return _client
@@ -0,0 +1,213 @@
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Where to export. Nothing is exported unless configured:
+#   ANBUPAYAN_METRICS_FILE  Prometheus text file, rewritten at most every few seconds
+#   ANBUPAYAN_METRICS_PORT  serve the same text on http://127.0.0.1:<port>/metrics
+#   ANBUPAYAN_METRICS_LOG   "-" for stderr or a path; one JSON line per span
+METRICS_FILE = os.getenv("ANBUPAYAN_METRICS_FILE")
+METRICS_PORT = os.getenv("ANBUPAYAN_METRICS_PORT")
+METRICS_LOG = os.getenv("ANBUPAYAN_METRICS_LOG")
+FILE_INTERVAL = 5.0
+RESERVOIR_SIZE = 2048
+QUANTILES = (0.5, 0.95, 0.99)
+
+logger = logging.getLogger("anbupayan.metrics")
+
+_page = contextvars.ContextVar("metrics_page", default="")
+_spans = contextvars.ContextVar("metrics_spans", default=())
+_lock = threading.Lock()
+_durations = defaultdict(lambda: {"samples": deque(maxlen=RESERVOIR_SIZE), "sum": 0.0, "count": 0})
+_counters = defaultdict(float)
+_last_file_write = 0.0
+
+
+def set_page(page):
+    # Called at the top of each Streamlit page so spans carry a page label.
+    _page.set(page)
+
+
+def _labels(stage, labels):
+    merged = {"stage": stage, "page": _page.get() or "none"}
+    merged.update({key: str(value) for key, value in labels.items() if value is not None})
+    return tuple(sorted(merged.items()))
+
+
+def count(name, value=1, **labels):
+    key = (name, _labels(labels.pop("stage", ""), labels))
+    with _lock:
+        _counters[key] += value
+
+
+def annotate(**attributes):
+    # Adds attributes to the innermost open span, e.g. retry counts from
+    # the LLM client or cache hits from the response cache.
+    spans = _spans.get()
+    if spans:
+        spans[-1].update(attributes)
+
+
+@contextlib.contextmanager
+def span(stage, **labels):
+    attributes = {}
+    token = _spans.set(_spans.get() + (attributes,))
+    started = time.perf_counter()
+    try:
+        yield attributes
+    finally:
+        seconds = time.perf_counter() - started
+        _spans.reset(token)
+        observe(stage, seconds, attributes, **labels)
+
+
+def observe(stage, seconds, attributes=None, **labels):
+    # span() calls this when a block finishes; generators, which cannot
+    # hold a span open across yields, time themselves and call it directly.
+    attributes = attributes or {}
+    key = _labels(stage, labels)
+    with _lock:
+        series = _durations[key]
+        series["samples"].append(seconds)
+        series["sum"] += seconds
+        series["count"] += 1
+        for name, value in attributes.items():
+            if isinstance(value, bool):
+                _counters[(f"{name}_total", key)] += int(value)
+            elif isinstance(value, (int, float)):
+                _counters[(f"{name}_total", key)] += value
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({"stage": stage, "seconds": round(seconds, 6), **dict(key), **attributes}, ensure_ascii=False))
+    if METRICS_FILE:
+        _maybe_write_file()
+
+
+def usage_tokens(response):
+    # Token counts from Gemini's usage metadata; the fake and stub backends
+    # report none.
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return {}
+    return {
+        "prompt_tokens": getattr(usage, "prompt_token_count", None) or 0,
+        "response_tokens": getattr(usage, "candidates_token_count", None) or 0,
+    }
+
+
+def _quantile(sorted_samples, q):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, int(round(q * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+def summary():
+    # {(labels...): {"count", "sum", "p50", "p95", "p99"}} for every stage series.
+    with _lock:
+        snapshot = {key: (sorted(series["samples"]), series["sum"], series["count"]) for key, series in _durations.items()}
+    result = {}
+    for key, (samples, total, n) in snapshot.items():
+        stats = {"count": n, "sum": total}
+        for q in QUANTILES:
+            stats[f"p{int(q * 100)}"] = _quantile(samples, q)
+        result[key] = stats
+    return result
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, **extra):
+    items = list(labels) + sorted(extra.items())
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in items) + "}"
+
+
+def render_prometheus():
+    lines = [
+        "# HELP anbupayan_stage_seconds Time spent per stage.",
+        "# TYPE anbupayan_stage_seconds summary",
+    ]
+    for key, stats in sorted(summary().items()):
+        for q in QUANTILES:
+            lines.append(f"anbupayan_stage_seconds{_format_labels(key, quantile=q)} {stats[f'p{int(q * 100)}']:.6f}")
+        lines.append(f"anbupayan_stage_seconds_sum{_format_labels(key)} {stats['sum']:.6f}")
+        lines.append(f"anbupayan_stage_seconds_count{_format_labels(key)} {stats['count']}")
+    with _lock:
+        counters = dict(_counters)
+    for name in sorted({name for name, _ in counters}):
+        metric = f"anbupayan_{name}"
+        lines.append(f"# TYPE {metric} counter")
+        for (counter_name, key), value in sorted(counters.items()):
+            if counter_name == name:
+                lines.append(f"{metric}{_format_labels(key)} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics_file(path=None):
+    path = path or METRICS_FILE
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+
+
+def _maybe_write_file():
+    global _last_file_write
+    now = time.monotonic()
+    with _lock:
+        if now - _last_file_write < FILE_INTERVAL:
+            return
+        _last_file_write = now
+    write_metrics_file()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+def reset():
+    with _lock:
+        _durations.clear()
+        _counters.clear()
+
+
+if METRICS_LOG:
+    _handler = logging.StreamHandler() if METRICS_LOG == "-" else logging.FileHandler(METRICS_LOG, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+if METRICS_PORT:
+    try:
+        start_metrics_server(METRICS_PORT)
+    except OSError as e:
+        # Another Streamlit worker on this host already serves the port.
+        logger.warning("metrics server not started on port %s: %s", METRICS_PORT, e)
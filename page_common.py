@@ -0,0 +1,127 @@
+import uuid
+
+import streamlit as st
+from streamlit_folium import st_folium
+
+from gazetteer import PlaceError, UnknownPlaceError, distance_km, resolve_place
+from jobs import get_job_queue
+from prefetch import get_prefetcher
+from state_store import get_session_store
+from trip_map import build_map
+
+JOB_POLL_SECONDS = 0.5
+
+
+
+def session_id():
+    # Kept in the URL, so a user whose next request lands on another worker
+    # process, or who reloads the page, gets the same plans and chat back.
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = st.query_params.get("sid") or uuid.uuid4().hex
+    st.query_params["sid"] = st.session_state.session_id
+    return st.session_state.session_id
+
+
+def restore_session(names):
+    # Loads each name from the session store once per browser session.
+    restored = st.session_state.setdefault("restored", [])
+    missing = [name for name in names if name not in restored]
+    if missing:
+        st.session_state.update(get_session_store().load(session_id(), missing))
+        restored.extend(missing)
+
+
+def save_session(names):
+    get_session_store().save(session_id(), {name: st.session_state.get(name) for name in names})
+
+
+def new_session():
+    # The old link still opens what was saved under it until that expires,
+    # but nothing from this browser is written there any more.
+    st.session_state.clear()
+    st.session_state.session_id = uuid.uuid4().hex
+
+
+def session_notice():
+    # The ID in the URL is the only key to a saved session, so whoever has
+    # the link has the plans and chat memory.
+    with st.sidebar:
+        st.caption("🔗 Your plans and chat are saved under this page's link. Anyone you share the link with can open them.")
+        st.button("Start a new session", on_click=new_session)
+
+
+
+
+def option_index(options, value):
+    # A restored session may hold an option that is no longer offered.
+    return options.index(value) if value in options else 0
+
+
+def check_route(departure, destination):
+    # Resolves both places locally on every rerun, so a typo is flagged
+    # while typing and never costs a model call. Returns the error that
+    # blocks generation; an unknown place is only a warning.
+    if not departure or not destination:
+        return None
+    try:
+        origin = resolve_place(departure, "departure")
+        target = resolve_place(destination, "destination")
+    except UnknownPlaceError as e:
+        st.caption(f"⚠️ {e} Planning without a distance estimate.")
+        return None
+    except PlaceError as e:
+        st.caption(f"⚠️ {e}")
+        return str(e)
+    st.caption(f"📍 {origin.label} → {target.label}: about {distance_km(origin, target):.0f} km")
+    return None
+
+
+
+def show_map(names, destination, key):
+    # Geocoding results are cached, so a repeat destination makes no
+    # requests to the geocoder.
+    with st.spinner("Locating places on the map..."):
+        trip_map = build_map(names, destination)
+    if trip_map is None:
+        st.info("None of the places could be located.")
+    else:
+        st_folium(trip_map, key=key, height=420, use_container_width=True, returned_objects=[])
+
+
+def start_job(name, kind, func, *args, stream=False, finish=None, **kwargs):
+    # Generation runs on the shared job queue, so the script thread is free
+    # and a widget change while waiting does not throw the work away.
+    # A matching prefetch from the other page is used instead, even if it
+    # is still running.
+    st.session_state.jobs[name] = (
+        get_prefetcher().claim(kind, *args, **kwargs)
+        or get_job_queue().submit(kind, func, *args, stream=stream, finish=finish, **kwargs)
+    )
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def show_job(name, message, preview):
+    # Polls one job; when it finishes the result is stored under the same
+    # name in the session and the whole page reruns to show it.
+    job = st.session_state.jobs.get(name)
+    if job is None:
+        return
+    if not job.done:
+        st.caption(f"⏳ {message}")
+        if job.pieces:
+            preview(job.text())
+        return
+    del st.session_state.jobs[name]
+    if job.error is not None:
+        st.session_state.job_errors[name] = str(job.error)
+    else:
+        st.session_state[name] = job.result
+    st.rerun()
+
+
+def job_section(name, message, preview=st.text):
+    # preview shows the text streamed so far.
+    if name in st.session_state.jobs:
+        show_job(name, message, preview)
+    if name in st.session_state.job_errors:
+        st.error(st.session_state.job_errors.pop(name))
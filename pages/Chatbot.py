@@ -1,58 +1,68 @@
 import streamlit as st
-import google.generativeai as genai
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-
-model = genai.GenerativeModel("gemini-2.0-flash-001")
+from answer_cache import get_answer_cache, is_context_free
+from chat_context import CHAT_RULES, ChatContext
+from font_registry import LANG_FONT_MAP
+from llm_client import DEFAULT_MODEL, get_client
+from metrics import set_page, span, usage_tokens
+from page_common import session_id, session_notice
+from state_store import get_session_store
 
+set_page("chatbot")
 st.set_page_config(page_title="AnbuPayanAI")
 st.title("🌍AnbuPayanAI")
 st.header("Multilingual Chatbot")
+session_notice()
 
 language = st.selectbox(
     "Select language",
-    ['English','Hindi','Bengali','Telugu','Marathi','Tamil','Gujarati','Kannada','Malayalam']
+    list(LANG_FONT_MAP.keys())
 )
 
-if 'chat_session' not in st.session_state:
-    st.session_state['chat_session'] = model.start_chat(history=[])
+if 'chat_context' not in st.session_state:
+    saved = get_session_store().load(session_id(), ["chat_context", "chat_display"])
+    st.session_state['chat_context'] = ChatContext.from_dict(saved.get("chat_context", {}))
+    st.session_state['chat_display'] = saved.get("chat_display", [])
 
 if 'chat_display' not in st.session_state:
     st.session_state['chat_display'] = [] 
 
-def gemini_response(language, user_input, chat_session):
-    prompt = f"""
-You are a friendly multilingual chatbot that helps users with trip planning and bookings.
+def get_chat_model(language):
+    # The rules go out once as the system instruction instead of being
+    # prepended to every message.
+    return get_client().model(DEFAULT_MODEL, system_instruction=CHAT_RULES.format(language=language))
 
-Rules:
-1. Always respond in {language}.
-2. Give short and precise answers in bullet points.
-3. Remember user details like budget, destination, travel dates, and preferences during the conversation.
-4. Only answer trip planning or user info questions. If the question is unrelated, reply: "Please ask relevant questions."
-5. Trip planning includes:
-   - Budget suggestions
-   - Destinations
-   - Flight booking
-   - Train booking
-   - Bus booking
-   - Hotels
-   - Places to visit
-   - Other travel services available on platforms like EaseMyTrip
-6. If you are not sure about something, say "I don’t know" instead of making things up.
-7. Give step-by-step guidance for bookings (like how to search for flights/trains/buses, best timing, tips, etc.).
-8. After every response, ask one relevant follow-up question to guide the user in planning their trip.
-"""
+def gemini_response(language, user_input, chat_context):
+    # Self-contained questions ("how do I book a train from Chennai to
+    # Bangalore") are answered from earlier sessions when a close enough
+    # match exists; anything leaning on this session's details goes to Gemini.
+    shareable = is_context_free(user_input, chat_context.memory)
+    if shareable:
+        with span("answer_cache", kind="chat", language=language) as attributes:
+            answer, _ = get_answer_cache().lookup(user_input, language)
+            attributes["cache_hit"] = answer is not None
+        if answer is not None:
+            chat_context.remember(user_input)
+            chat_context.record(user_input, answer, cached=True)
+            return answer
 
-    response = chat_session.send_message(f"{prompt}\nUser: {user_input}")
+    with span("prompt", kind="chat", language=language):
+        contents = chat_context.build_contents(user_input)
+    with span("llm", kind="chat", language=language) as attributes:
+        response = get_chat_model(language).generate_content(contents)
+        attributes.update(
+            prompt_chars=sum(len(part) for content in contents for part in content["parts"]),
+            response_chars=len(response.text),
+            **usage_tokens(response),
+        )
+    chat_context.record(user_input, response.text, contents, getattr(response, "usage_metadata", None))
+    if shareable:
+        get_answer_cache().add(user_input, language, response.text)
     return response.text
 
 user_input = st.chat_input("Ask the question", key="input")
 
 if user_input:
-    response = gemini_response(language, user_input, st.session_state['chat_session'])
+    response = gemini_response(language, user_input, st.session_state['chat_context'])
     st.session_state['chat_display'].append(("You", user_input))
     st.session_state['chat_display'].append(("Bot", response))
 
@@ -62,4 +72,12 @@ for sender, msg in st.session_state['chat_display']:
     else:
         st.chat_message("assistant").write(msg)
 
+accounting = st.session_state['chat_context'].accounting
+if accounting:
+    with st.expander("Token usage per turn"):
+        st.table(accounting)
 
+get_session_store().save(session_id(), {
+    "chat_context": st.session_state['chat_context'].to_dict(),
+    "chat_display": st.session_state['chat_display'],
+})
@@ -0,0 +1,351 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import Flowable, PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from font_registry import font_for_language
+from metrics import span
+
+# Bump when the PDF layout changes so stale cached documents are not served.
+LAYOUT_VERSION = "2"
+PDF_CACHE_ENTRIES = 64
+# Combined documents are written to a temporary file that stays in memory
+# up to this size and moves to disk beyond it.
+PDF_SPOOL_BYTES = int(os.getenv("ANBUPAYAN_PDF_SPOOL_BYTES", 8 * 1024 * 1024))
+# Budget tables are laid out a page's worth of rows at a time, starting with
+# this many, so a long table costs the same per page however long it is.
+TABLE_CHUNK_ROWS = 80
+CHUNK_SLACK_ROWS = 8
+BUDGET_COL_WIDTHS = [120, 260, 100]
+CELL_PADDING = 12
+# Flowables built ahead of the one being laid out.
+LOOKAHEAD = 16
+
+_pdf_cache = OrderedDict()
+_pdf_lock = threading.Lock()
+_styles = {}
+
+
+def _new_document(output):
+    return SimpleDocTemplate(output, pagesize=A4, rightMargin=18, leftMargin=18, topMargin=18, bottomMargin=18)
+
+
+def _style(name, font_name, **kwargs):
+    # Styles are shared by every document, one set per font.
+    key = (name, font_name)
+    style = _styles.get(key)
+    if style is None:
+        style = _styles[key] = ParagraphStyle(name=name, fontName=font_name, **kwargs)
+    return style
+
+
+def _is_plain(text):
+    # Text Paragraph would draw as it is: no markup or entities.
+    return "<" not in text and "&" not in text
+
+
+class _Line(Flowable):
+    # One line of itinerary text. Most lines fit the page width and are drawn
+    # directly, which is much cheaper than parsing them as a Paragraph; a
+    # line that is too wide falls back to one so it still wraps.
+
+    def __init__(self, text, style):
+        super().__init__()
+        self.text = " ".join(text.split())
+        self.style = style
+        self._para = None
+
+    def wrap(self, available_width, available_height):
+        style = self.style
+        if self._para is None and stringWidth(self.text, style.fontName, style.fontSize) <= available_width:
+            self.width, self.height = available_width, style.leading
+            return self.width, self.height
+        if self._para is None:
+            self._para = Paragraph(self.text, style)
+        self.width, self.height = self._para.wrap(available_width, available_height)
+        return self.width, self.height
+
+    def split(self, available_width, available_height):
+        return self._para.split(available_width, available_height) if self._para else []
+
+    def draw(self):
+        if self._para is not None:
+            self._para.drawOn(self.canv, 0, 0)
+            return
+        style = self.style
+        self.canv.setFont(style.fontName, style.fontSize)
+        self.canv.drawString(0, style.leading - style.fontSize, self.text)
+
+
+def itinerary_elements(itinerary_text, language="English", title="Personalized Travel Itinerary"):
+    # A generator, so a long or combined document only holds the flowables
+    # the layout has not reached yet.
+    font_name = font_for_language(language)
+    normal_style = _style("Line", font_name, fontSize=10, leading=14, spaceAfter=4)
+    title_style = _style("ItineraryTitle", font_name, fontSize=16, leading=20)
+
+    yield Paragraph(escape(title), title_style)
+    yield Spacer(1, 12)
+
+    for line in itinerary_text.splitlines():
+        if line.strip():
+            yield _Line(line, normal_style) if _is_plain(line) else Paragraph(line, normal_style)
+
+
+class _ChunkedTable(Flowable):
+    # A table with a repeated header that is only built and measured a chunk
+    # of rows at a time. Splitting one big reportlab Table re-measures every
+    # remaining row on every page, which grows with the square of its length.
+
+    def __init__(self, header, rows, make_table, first_row=1, chunk_rows=TABLE_CHUNK_ROWS):
+        super().__init__()
+        self.header = header
+        self.rows = rows
+        self.make_table = make_table
+        self.first_row = first_row  # index of rows[0] in the whole table
+        self.chunk_rows = chunk_rows
+        self._table = None
+        self._table_rows = 0
+
+    def wrap(self, available_width, available_height):
+        size = max(self._table_rows, self.chunk_rows)
+        while True:
+            if self._table is None or self._table_rows != min(size, len(self.rows)):
+                self._table_rows = min(size, len(self.rows))
+                self._table = self.make_table(self.header, self.rows[:self._table_rows], self.first_row)
+            self.width, self.height = self._table.wrap(available_width, available_height)
+            # Either everything is in, or the chunk overflows and the frame
+            # will split it; only a very tall frame needs a bigger chunk.
+            if self._table_rows == len(self.rows) or self.height > available_height:
+                return self.width, self.height
+            size *= 2
+
+    def split(self, available_width, available_height):
+        self.wrap(available_width, available_height)
+        parts = self._table.split(available_width, available_height)
+        if not parts:
+            return []
+        used = len(parts[0]._cellvalues) - 1
+        if used <= 0:
+            return []
+        if used == len(self.rows):
+            return [parts[0]]
+        # The next page holds about as many rows as this one did.
+        rest = _ChunkedTable(self.header, self.rows[used:], self.make_table, self.first_row + used, used + CHUNK_SLACK_ROWS)
+        return [parts[0], rest]
+
+    def draw(self):
+        self._table.drawOn(self.canv, 0, 0)
+
+
+def _wrap_words(text, font_name, font_size, width):
+    # Greedy word wrap, as Paragraph does for plain text, giving lines for a
+    # plain string cell. None when a single word is wider than the cell.
+    space = stringWidth(" ", font_name, font_size)
+    lines, line, line_width = [], [], 0
+    for word in text.split():
+        word_width = stringWidth(word, font_name, font_size)
+        if word_width > width:
+            return None
+        if line and line_width + space + word_width > width:
+            lines.append(" ".join(line))
+            line, line_width = [], 0
+        line_width += word_width + (space if line else 0)
+        line.append(word)
+    if line:
+        lines.append(" ".join(line))
+    return lines
+
+
+def _budget_cell(text, width, font_name, style):
+    # Plain strings, wrapped here, are much cheaper for the table to lay out
+    # than Paragraphs; only text with markup still gets one.
+    if _is_plain(text):
+        lines = _wrap_words(text, font_name, style.fontSize, width - CELL_PADDING)
+        if lines is not None:
+            return "\n".join(lines)
+    return Paragraph(text, style)
+
+
+def budget_elements(table_data, notes, language="English", highlight_row_idx=None, title="Travel Budget Recommendation"):
+    font_name = font_for_language(language)
+    normal_style = _style("Cell", font_name, fontSize=9, leading=12)
+    title_style = _style("BudgetTitle", font_name, fontSize=18, leading=22)
+
+    yield Paragraph(escape(title), title_style)
+    yield Spacer(1, 12)
+
+    def make_table(header, rows, first_row):
+        data = [header] + [
+            [_budget_cell(str(cell), width, font_name, normal_style) for cell, width in zip(row, BUDGET_COL_WIDTHS)]
+            for row in rows
+        ]
+        style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#4B9CD3")),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, -1), font_name),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('LEADING', (0, 0), (-1, -1), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.whitesmoke),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ])
+        if highlight_row_idx is not None:
+            row = highlight_row_idx - first_row + 1
+            if highlight_row_idx == 0:
+                style.add('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#FFF2CC"))
+            elif 1 <= row < len(data):
+                style.add('BACKGROUND', (0, row), (-1, row), colors.HexColor("#FFF2CC"))
+        return Table(data, colWidths=BUDGET_COL_WIDTHS, repeatRows=1, style=style)
+
+    if table_data:
+        header = [Paragraph(str(cell), normal_style) for cell in table_data[0]]
+        yield _ChunkedTable(header, table_data[1:], make_table)
+
+    yield Spacer(1, 12)
+    if notes:
+        yield Paragraph(f"<b>Notes:</b> {notes}", normal_style)
+
+
+class _FlowableFeed(list):
+    # The document template pops flowables off the front of a list until it
+    # is empty. This list tops itself up from a generator whenever it runs
+    # low, so sections are only built as the layout reaches them.
+
+    def __init__(self, flowables, lookahead=LOOKAHEAD):
+        super().__init__()
+        self._source = iter(flowables)
+        self._lookahead = lookahead
+        self.fed = 0
+
+    def __len__(self):
+        while list.__len__(self) < self._lookahead:
+            flowable = next(self._source, None)
+            if flowable is None:
+                break
+            self.append(flowable)
+            self.fed += 1
+        return list.__len__(self)
+
+
+def _section_flowables(sections):
+    for index, section in enumerate(sections):
+        if index:
+            yield PageBreak()
+        yield from section
+
+
+def _build(sections, kind, language, output=None):
+    # Renders into output (any binary file object) or a new BytesIO, and
+    # returns it rewound. Each font is subset and embedded once per document,
+    # however many sections use it.
+    output = io.BytesIO() if output is None else output
+    flowables = _FlowableFeed(_section_flowables(sections))
+    with span("pdf_render", kind=kind, language=language) as attributes:
+        _new_document(output).build(flowables)
+        attributes["flowables"] = flowables.fed
+        attributes["pdf_bytes"] = output.tell()
+    output.seek(0)
+    return output
+
+
+def generate_itinerary_pdf(itinerary_text, language="English", output=None):
+    return _build([itinerary_elements(itinerary_text, language)], "itinerary", language, output)
+
+
+def generate_budget_pdf(table_data, notes, language="English", highlight_row_idx=None, output=None):
+    return _build([budget_elements(table_data, notes, language, highlight_row_idx)], "budget", language, output)
+
+
+def generate_multilang_itinerary_pdf(itineraries, output=None):
+    # One section per language, each set in that language's Noto font.
+    return _build((
+        itinerary_elements(text, language, title=f"Personalized Travel Itinerary ({language})")
+        for language, text in itineraries.items()
+    ), "itinerary-multi", "multi", output)
+
+
+def generate_multilang_budget_pdf(budgets, output=None):
+    # budgets maps language -> (table_data, notes, highlight_row_idx)
+    return _build((
+        budget_elements(table_data, notes, language, highlight_row_idx, title=f"Travel Budget Recommendation ({language})")
+        for language, (table_data, notes, highlight_row_idx) in budgets.items()
+    ), "budget-multi", "multi", output)
+
+
+def _document_elements(kind, language, content, title):
+    if kind == "itinerary":
+        return itinerary_elements(content, language, title or "Personalized Travel Itinerary")
+    if kind == "budget":
+        table_data, notes, highlight_row_idx = content
+        return budget_elements(table_data, notes, language, highlight_row_idx, title or "Travel Budget Recommendation")
+    raise ValueError(f"Unknown document kind '{kind}'; use 'itinerary' or 'budget'.")
+
+
+def generate_combined_pdf(documents, output=None):
+    # Many itineraries and budgets in one PDF, one section each. documents
+    # yields (kind, language, content, title) with content the itinerary text
+    # or (table_data, notes, highlight_row_idx), and title None for the
+    # default. It is read lazily, so it can stream from a results file.
+    # Without an output the PDF goes to a spooled temporary file.
+    if output is None:
+        output = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_BYTES)
+    return _build((
+        _document_elements(kind, language, content, title) for kind, language, content, title in documents
+    ), "combined", "multi", output)
+
+
+def _pdf_key(kind, language, content):
+    payload = json.dumps([kind, LAYOUT_VERSION, language, content], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _cached_pdf(key, render):
+    with _pdf_lock:
+        data = _pdf_cache.get(key)
+        if data is not None:
+            _pdf_cache.move_to_end(key)
+            return data
+    data = render().getvalue()
+    with _pdf_lock:
+        _pdf_cache[key] = data
+        _pdf_cache.move_to_end(key)
+        while len(_pdf_cache) > PDF_CACHE_ENTRIES:
+            _pdf_cache.popitem(last=False)
+    return data
+
+
+def itinerary_pdf_bytes(itinerary_text, language="English"):
+    # Rendered once per distinct text/language and shared by every session.
+    key = _pdf_key("itinerary", language, itinerary_text)
+    return _cached_pdf(key, lambda: generate_itinerary_pdf(itinerary_text, language=language))
+
+
+def budget_pdf_bytes(table_data, notes, language="English", highlight_row_idx=None):
+    key = _pdf_key("budget", language, [table_data, notes, highlight_row_idx])
+    return _cached_pdf(
+        key,
+        lambda: generate_budget_pdf(table_data, notes, language=language, highlight_row_idx=highlight_row_idx),
+    )
+
+
+def multilang_itinerary_pdf_bytes(itineraries):
+    key = _pdf_key("itinerary-multi", sorted(itineraries), itineraries)
+    return _cached_pdf(key, lambda: generate_multilang_itinerary_pdf(itineraries))
+
+
+def multilang_budget_pdf_bytes(budgets):
+    key = _pdf_key("budget-multi", sorted(budgets), budgets)
+    return _cached_pdf(key, lambda: generate_multilang_budget_pdf(budgets))
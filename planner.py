@@ -0,0 +1,431 @@
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from budget_math import budget_text, check_budget, format_amount, parse_amount
+from gazetteer import UnknownPlaceError, distance_km, resolve_place
+from llm_client import DEFAULT_MODEL, get_client
+from metrics import observe, span, usage_tokens
+from response_cache import get_cache, make_key
+from text_processing import IncrementalCleaner, clean_response_text, days_mentioned, parse_budget_text, split_day_blocks
+
+_model_override = None
+
+def use_model(model):
+    # Swaps in another backend object, e.g. fake_model.FakeModel in tests.
+    # Cache keys use the model name, so fake output never mixes with real.
+    global _model_override
+    _model_override = model
+
+ITINERARY_MODEL_NAME = DEFAULT_MODEL
+# Bump whenever the prompt text changes so cached responses are not reused.
+ITINERARY_PROMPT_VERSION = "itinerary-v2"
+
+def itinerary_model():
+    return _model_override or get_client().model(ITINERARY_MODEL_NAME)
+
+def route_note(departure, destination):
+    # Resolving both places here means an ambiguous name raises PlaceError
+    # before any model call, for every page and the batch CLI. A place the
+    # gazetteer does not know is planned without the distance note.
+    try:
+        target = resolve_place(destination, "destination")
+        if not departure:
+            return ""
+        origin = resolve_place(departure, "departure")
+    except UnknownPlaceError:
+        return ""
+    return (
+        f"Straight-line distance from {origin.label} to {target.label}: about {distance_km(origin, target):.0f} km. "
+        "Base transport costs on this distance.\n"
+    )
+
+def _generate_text(model, prompt, kind, language):
+    with span("llm", kind=kind, language=language) as attributes:
+        response = model.generate_content(prompt)
+        attributes.update(prompt_chars=len(prompt), response_chars=len(response.text), **usage_tokens(response))
+    return response.text
+
+def _stream_text(model, prompt, kind, language):
+    # Timed by hand rather than with span(): the caller resumes this
+    # generator from its own context, so a span cannot stay open across yields.
+    started = time.perf_counter()
+    response_chars = 0
+    tokens = {}
+    for index, chunk in enumerate(model.generate_content(prompt, stream=True)):
+        if index == 0:
+            observe("llm_first_chunk", time.perf_counter() - started, kind=kind, language=language)
+        response_chars += len(chunk.text)
+        tokens = usage_tokens(chunk) or tokens
+        yield chunk.text
+    observe(
+        "llm", time.perf_counter() - started,
+        {"prompt_chars": len(prompt), "response_chars": response_chars, **tokens}, kind=kind, language=language,
+    )
+
+def _clean(text, kind, language):
+    with span("clean", kind=kind, language=language):
+        return clean_response_text(text)
+
+def build_itinerary_prompt(departure, destination, days, budget, interests, language, suggestion=None):
+    prompt = f"""
+    You are an expert travel planner AI.
+
+    Task:
+    Create a detailed {days}-day itinerary for a traveler departing from {departure} to {destination}.
+
+    Traveler details:
+    - Departure: {departure}
+    - Destination: {destination}
+    - Budget: ₹{budget}
+    - Interests: {interests}
+    - Language: {language}
+
+    Validation Rules:
+    1) If departure or destination is missing, ambiguous, or not a real place, STOP and ask the user to provide a proper city or town name.
+    2) If number of days, budget, or people count is invalid (e.g., zero, negative, or unrealistic), STOP and ask the user to correct the details.
+    3) If inputs are valid, proceed with generating the itinerary.
+
+    Output Rules:
+    1) The entire response MUST be written in {language}.
+    2) Don't say Here's the output, I will generate the content kind of sentence. Just start from Day 1 Itinerary generation. It should be followed for every languages.
+    2) The itinerary must be structured day-wise:
+    - Start each day with "Day X:" on a new line.
+    - Use separate lines for Morning, Afternoon, and Evening plans.
+    - Keep descriptions short, clear, and easy to read.
+    3) Use "|" ONLY when separating Category/Activity/Cost in the final cost summary.
+    4) Output must be plain text only — NO Markdown, NO HTML, NO code blocks.
+    5) Include costs for travel, accommodation, food, and activities each day.
+    6) At the end, give a clean cost summary table-like format:
+    Category | Estimated Cost (INR)
+    ...
+    Total Estimated Cost | <amount>
+    7) Finally, state whether it "Fits within budget" or "Exceeds budget".
+    """
+
+
+    prompt += f"\n{route_note(departure, destination)}"
+    if suggestion:
+        prompt += f"\nUser suggestion to adjust itinerary: {suggestion}\n"
+    return prompt
+
+def itinerary_cache_key(departure, destination, days, budget, interests, language, suggestion=None):
+    return make_key(
+        kind="itinerary", departure=departure, destination=destination, days=days, budget=budget,
+        interests=interests, language=language, suggestion=suggestion,
+        model=itinerary_model().model_name, prompt_version=ITINERARY_PROMPT_VERSION,
+    )
+
+def generate_itinerary(departure, destination, days, budget, interests, language, suggestion=None):
+    with span("generate", kind="itinerary", language=language):
+        with span("prompt", kind="itinerary", language=language):
+            prompt = build_itinerary_prompt(departure, destination, days, budget, interests, language, suggestion)
+        cache_key = itinerary_cache_key(departure, destination, days, budget, interests, language, suggestion)
+        return get_cache().get_or_create(
+            cache_key,
+            lambda: _clean(_generate_text(itinerary_model(), prompt, "itinerary", language), "itinerary", language),
+        )
+
+def stream_itinerary(departure, destination, days, budget, interests, language, suggestion=None):
+    # Yields cleaned text as soon as it arrives; the joined pieces are
+    # identical to what generate_itinerary returns.
+    started = time.perf_counter()
+    prompt = build_itinerary_prompt(departure, destination, days, budget, interests, language, suggestion)
+    cache_key = itinerary_cache_key(departure, destination, days, budget, interests, language, suggestion)
+    cached = get_cache().get(cache_key)
+    if cached is not None:
+        yield cached
+        observe("generate", time.perf_counter() - started, {"cache_hit": True}, kind="itinerary", language=language)
+        return
+
+    cleaner = IncrementalCleaner()
+    pieces = []
+    for text in _stream_text(itinerary_model(), prompt, "itinerary", language):
+        piece = cleaner.feed(text)
+        if piece:
+            pieces.append(piece)
+            yield piece
+    piece = cleaner.close()
+    if piece:
+        pieces.append(piece)
+        yield piece
+    if pieces:
+        get_cache().set(cache_key, "".join(pieces))
+    observe("generate", time.perf_counter() - started, {"cache_miss": True}, kind="itinerary", language=language)
+
+
+DAY_EDIT_PROMPT_VERSION = "itinerary-days-v1"
+
+def build_day_edit_prompt(day_blocks, destination, budget, interests, language, suggestion):
+    days_text = "\n".join(block for _, block in day_blocks)
+    return f"""
+    You are an expert travel planner AI.
+
+    Below are {len(day_blocks)} day(s) of an existing itinerary to {destination} (budget ₹{budget}, interests: {interests}).
+    Rewrite ONLY these days to apply the user's suggestion. Keep everything the suggestion does not affect.
+
+    User suggestion: {suggestion}
+
+    Days to rewrite:
+    {days_text}
+
+    Output Rules:
+    1) The entire response MUST be written in {language}.
+    2) Output only the rewritten days, each starting with its original "Day X:" line on a new line.
+    3) Use separate lines for Morning, Afternoon, and Evening plans and keep the costs for each.
+    4) Output must be plain text only — NO Markdown, NO HTML, NO code blocks, NO cost summary.
+    """
+
+def build_summary_update_prompt(summary, old_days, new_days, budget, language):
+    old_text = "\n".join(block for _, block in old_days)
+    new_text = "\n".join(block for _, block in new_days)
+    return f"""
+    You are an expert travel planner AI.
+
+    Some days of an itinerary were changed. Update its cost summary to match the changes.
+
+    Current cost summary:
+    {summary}
+
+    Changed days before:
+    {old_text}
+
+    Changed days after:
+    {new_text}
+
+    Output Rules:
+    1) The entire response MUST be written in {language}.
+    2) Output only the updated summary, plain text only — NO Markdown, NO HTML, NO code blocks:
+    Category | Estimated Cost (INR)
+    ...
+    Total Estimated Cost | <amount>
+    3) Finally, state whether it "Fits within budget" or "Exceeds budget" for a budget of ₹{budget}.
+    """
+
+def _generate_cleaned(prompt, kind, language, **key_fields):
+    cache_key = make_key(
+        model=itinerary_model().model_name, prompt_version=DAY_EDIT_PROMPT_VERSION,
+        kind=kind, language=language, **key_fields,
+    )
+    with span("generate", kind=kind, language=language):
+        return get_cache().get_or_create(
+            cache_key, lambda: _clean(_generate_text(itinerary_model(), prompt, kind, language), kind, language)
+        )
+
+def suggestion_days(itinerary_text, suggestion):
+    blocks = split_day_blocks(itinerary_text)
+    targets = days_mentioned(suggestion, max(blocks.day_numbers(), default=0))
+    return [day for day in targets if day in blocks.day_numbers()]
+
+def regenerate_itinerary_days(itinerary_text, departure, destination, days, budget, interests, language, suggestion):
+    # Applies a day-specific suggestion ("make Day 3 evening vegetarian")
+    # by regenerating only the days it mentions and then the cost summary,
+    # so the cost tracks the size of the edit, not the length of the trip.
+    # Anything not clearly day-specific falls back to a full regeneration.
+    blocks = split_day_blocks(itinerary_text)
+    targets = suggestion_days(itinerary_text, suggestion)
+    if not targets:
+        return generate_itinerary(departure, destination, days, budget, interests, language, suggestion)
+
+    old_days = [(number, block) for number, block in blocks.days if number in targets]
+    edited = _generate_cleaned(
+        build_day_edit_prompt(old_days, destination, budget, interests, language, suggestion),
+        "itinerary-days", language, itinerary=itinerary_text, suggestion=suggestion,
+    )
+    new_blocks = dict(split_day_blocks(edited).days)
+    if any(number not in new_blocks for number in targets):
+        return generate_itinerary(departure, destination, days, budget, interests, language, suggestion)
+
+    new_days = [(number, new_blocks[number]) for number in targets]
+    blocks.days = [(number, new_blocks[number] if number in targets else block) for number, block in blocks.days]
+    if blocks.summary:
+        blocks.summary = _generate_cleaned(
+            build_summary_update_prompt(blocks.summary, old_days, new_days, budget, language),
+            "itinerary-summary", language, itinerary=itinerary_text, suggestion=suggestion,
+        )
+    return blocks.text()
+
+BUDGET_MODEL_NAME = DEFAULT_MODEL
+# Bump whenever the prompt text changes so cached responses are not reused.
+BUDGET_PROMPT_VERSION = "budget-v2"
+FANOUT_WORKERS = int(os.getenv("ANBUPAYAN_FANOUT_WORKERS", 8))
+
+def budget_model():
+    return _model_override or get_client().model(BUDGET_MODEL_NAME)
+
+def budget_destination(location, departure=None):
+    # The pages pass "<departure> to <destination>" as the location.
+    return location[len(f"{departure} to "):] if departure and location.startswith(f"{departure} to ") else location
+
+def build_budget_prompt(location, days, user_budget, people, suggestion=None, language="English", departure=None):
+    base_prompt = f"""
+    You are a travel budget planner. Plan a {days}-day trip for a traveler **departing from {departure}** to {location} for {people} people.
+
+    Important rules:
+
+    1) Validate the provided locations:
+    - If the departure location or destination is missing, ambiguous, or not a real place, instruct the user clearly to provide a proper city or town name.
+    - Otherwise, proceed with planning.
+
+    2) Hotel room occupancy = 2 people per room.
+    - number_of_rooms = ceil({people}/2)
+    - number_of_nights = {days}
+    - accommodation cost = room_rate_per_night * number_of_rooms * number_of_nights.
+
+    3) Include travel expenses from {departure} to {location} and back in the Transport category.
+
+    4) Output strictly plain text in {language} with NO Markdown, NO asterisks, NO backticks, NO HTML.
+    Use only "|" for columns.
+
+    5) Format:
+    Category | Details (hotel/restaurant/attraction names and breakdown) | Estimated Cost (INR)
+
+    6) Categories:
+    - Transport
+    - Accommodation
+    - Food
+    - Attractions/Activities
+    - Miscellaneous
+
+    7) End with:
+    Total Estimated Cost |  | <numeric total>
+    Compare the {user_budget} and Total Estimated Cost, If the user input is invalid, don't give any one liner, If {user_budget}<= Total Estimated Cost give one line as "Fits within budget" 
+    OR give one line as "Exceeds budget — suggest cheaper alternatives"
+
+    8) Important:
+    - At the end, calculate the total cost and compare it with the budget accurately.
+    - Perform arithmetic operations perfectly. No wrong calculations should be present.
+    """
+
+
+    base_prompt += f"\n{route_note(departure, budget_destination(location, departure))}"
+    if suggestion:
+        base_prompt += f"User suggestion to apply: {suggestion}\n"
+    return base_prompt
+
+def budget_cache_key(location, days, user_budget, people, suggestion=None, language="English", departure=None):
+    return make_key(
+        kind="budget", departure=departure, destination=location, days=days, budget=user_budget,
+        people=people, language=language, suggestion=suggestion,
+        model=budget_model().model_name, prompt_version=BUDGET_PROMPT_VERSION,
+    )
+
+def get_budget(location, days, user_budget, people, suggestion=None, language="English", departure=None):
+    with span("generate", kind="budget", language=language):
+        with span("prompt", kind="budget", language=language):
+            base_prompt = build_budget_prompt(location, days, user_budget, people, suggestion, language, departure)
+        cache_key = budget_cache_key(location, days, user_budget, people, suggestion, language, departure)
+        return get_cache().get_or_create(
+            cache_key, lambda: _generate_text(budget_model(), base_prompt, "budget", language)
+        )
+
+ROW_PRICE_PROMPT_VERSION = "budget-rows-v1"
+
+def build_row_price_prompt(rows, location, days, people, departure=None):
+    rows_text = "\n".join(f"{category} | {details}" for category, details, _ in rows)
+    return f"""
+    You are pricing rows of a {days}-day trip budget for {people} people, from {departure} to {budget_destination(location, departure)}.
+    Hotel room occupancy is 2 people per room.
+
+    Rows to price:
+    {rows_text}
+
+    Reply with exactly one line per row, in the same order, as plain text:
+    Category | <total cost in INR for the whole group, digits only>
+    """
+
+def price_budget_rows(rows, location, days, people, language="English", departure=None):
+    # A short follow-up for the rows whose cost could not be read; returns
+    # one cost string per row, or None where the reply did not help either.
+    prompt = build_row_price_prompt(rows, location, days, people, departure)
+    cache_key = make_key(
+        kind="budget-rows", rows=[row[:2] for row in rows], destination=location, days=days, people=people,
+        departure=departure, model=budget_model().model_name, prompt_version=ROW_PRICE_PROMPT_VERSION,
+    )
+    reply = get_cache().get_or_create(cache_key, lambda: _generate_text(budget_model(), prompt, "budget-rows", language))
+    costs = [line.split("|")[-1].strip() for line in clean_response_text(reply).splitlines() if "|" in line]
+    if len(costs) != len(rows):
+        return [None] * len(rows)
+    return [cost if parse_amount(cost) is not None else None for cost in costs]
+
+def settle_budget(text, location, days, user_budget, people, suggestion=None, language="English", departure=None):
+    # Redoes the model's arithmetic locally: rooms, per-person costs, the
+    # total and the verdict. Only rows without a readable cost go back to
+    # the model, in a small follow-up rather than a full regeneration.
+    table_data, notes, total_row_idx = parse_budget_text(text)
+    if len(table_data) < 2:
+        return text
+    with span("settle", kind="budget", language=language) as attributes:
+        check = check_budget(table_data, notes, total_row_idx, days, people, user_budget)
+        repriced = 0
+        if check.unparsed:
+            rows = [table_data[index] for index in check.unparsed]
+            for index, cost in zip(check.unparsed, price_budget_rows(rows, location, days, people, language, departure)):
+                if cost is not None:
+                    table_data[index][2] = format_amount(parse_amount(cost))
+                    repriced += 1
+            if repriced:
+                check = check_budget(table_data, notes, total_row_idx, days, people, user_budget)
+        attributes.update(rows=len(table_data) - 1, repriced=repriced, unparsed=len(check.unparsed), corrections=len(check.changes))
+    if not check.changes and not repriced:
+        return text
+    return budget_text(check.table_data, check.notes)
+
+def get_budget_plan(location, days, user_budget, people, suggestion=None, language="English", departure=None):
+    # The text the pages display: get_budget cleaned as stream_budget does,
+    # with the arithmetic settled.
+    cleaned = _clean(get_budget(location, days, user_budget, people, suggestion, language, departure), "budget", language)
+    return settle_budget(cleaned, location, days, user_budget, people, suggestion, language, departure)
+
+def stream_budget(location, days, user_budget, people, suggestion=None, language="English", departure=None):
+    # Yields cleaned text as it arrives. The raw response is cached, like
+    # get_budget, so both paths share entries.
+    started = time.perf_counter()
+    base_prompt = build_budget_prompt(location, days, user_budget, people, suggestion, language, departure)
+    cache_key = budget_cache_key(location, days, user_budget, people, suggestion, language, departure)
+    cached = get_cache().get(cache_key)
+    if cached is not None:
+        yield _clean(cached, "budget", language)
+        observe("generate", time.perf_counter() - started, {"cache_hit": True}, kind="budget", language=language)
+        return
+
+    cleaner = IncrementalCleaner()
+    raw_chunks = []
+    for text in _stream_text(budget_model(), base_prompt, "budget", language):
+        raw_chunks.append(text)
+        piece = cleaner.feed(text)
+        if piece:
+            yield piece
+    piece = cleaner.close()
+    if piece:
+        yield piece
+    if raw_chunks:
+        get_cache().set(cache_key, "".join(raw_chunks))
+    observe("generate", time.perf_counter() - started, {"cache_miss": True}, kind="budget", language=language)
+
+def _fan_out(generate, languages):
+    # Runs one generation per language concurrently, so N languages cost
+    # roughly one round trip of wall-clock time instead of N.
+    languages = list(dict.fromkeys(languages))
+    if not languages:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(FANOUT_WORKERS, len(languages))) as pool:
+        # Each worker runs in a copy of the caller's context so its spans
+        # keep the page label.
+        futures = {
+            language: pool.submit(contextvars.copy_context().run, generate, language) for language in languages
+        }
+        return {language: future.result() for language, future in futures.items()}
+
+def generate_itinerary_languages(departure, destination, days, budget, interests, languages, suggestion=None):
+    return _fan_out(
+        lambda language: generate_itinerary(departure, destination, days, budget, interests, language, suggestion),
+        languages,
+    )
+
+def get_budget_languages(location, days, user_budget, people, languages, suggestion=None, departure=None):
+    return _fan_out(
+        lambda language: get_budget_plan(location, days, user_budget, people, suggestion, language, departure),
+        languages,
+    )
@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from jobs import get_job_queue, job_key
+from metrics import count
+from planner import generate_itinerary, get_budget_plan
+
+# Most people generate an itinerary and then open the Budget page for the same
+# trip, or the other way round, so the other plan is started speculatively.
+# It runs as an ordinary job, which puts the result in the response cache and
+# lets a page that asks for it while it is still running join the same job.
+PREFETCH_ENABLED = os.getenv("ANBUPAYAN_PREFETCH", "1") != "0"
+# Speculative jobs in flight per process; real requests always go first.
+PREFETCH_MAX_RUNNING = int(os.getenv("ANBUPAYAN_PREFETCH_MAX_RUNNING", 2))
+# A prefetch nobody claims within this many seconds is counted as wasted.
+PREFETCH_TTL = int(os.getenv("ANBUPAYAN_PREFETCH_TTL", 3600))
+PREFETCH_TRACKED = 1000
+DEFAULT_INTERESTS = "Food, Adventure, Culture"
+
+
+def itinerary_args(trip):
+    # The positional arguments Home.py submits for this trip.
+    return (
+        trip["departure"], trip["destination"], trip["days"], trip["budget"],
+        trip.get("interests") or DEFAULT_INTERESTS, trip["language"],
+    )
+
+
+def budget_kwargs(trip):
+    # The keyword arguments pages/Budget.py submits for this trip.
+    return dict(
+        location=f"{trip['departure']} to {trip['destination']}",
+        days=trip["days"],
+        user_budget=trip["budget"],
+        people=trip.get("people") or 1,
+        language=trip["language"],
+        departure=trip["departure"],
+    )
+
+
+class Prefetcher:
+    def __init__(self, enabled=PREFETCH_ENABLED, max_running=PREFETCH_MAX_RUNNING, ttl=PREFETCH_TTL):
+        self.enabled = enabled
+        self.max_running = max_running
+        self.ttl = ttl
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        while self._jobs:
+            key, (job, started) = next(iter(self._jobs.items()))
+            if started > now - self.ttl and len(self._jobs) <= PREFETCH_TRACKED:
+                break
+            del self._jobs[key]
+            count("prefetch_wasted", kind=job.kind)
+
+    def start(self, kind, func, *args, **kwargs):
+        # Returns the speculative Job, or None when prefetching is off or
+        # the caps say no.
+        if not self.enabled:
+            return None
+        key = job_key(kind, args, kwargs)
+        queue = get_job_queue()
+        with self._lock:
+            now = time.time()
+            self._expire(now)
+            if key in self._jobs:
+                return self._jobs[key][0]
+            running = sum(not job.done for job, _ in self._jobs.values())
+            # Leave a worker free so speculation never queues ahead of a click.
+            if running >= self.max_running or queue.running() >= queue.workers - 1:
+                count("prefetch_skipped", kind=kind)
+                return None
+            job = queue.submit(kind, func, *args, **kwargs)
+            self._jobs[key] = (job, now)
+        count("prefetch_started", kind=kind)
+        return job
+
+    def claim(self, kind, *args, **kwargs):
+        # Called with the arguments a page is about to submit. Returns the
+        # matching speculative Job, finished or not, and counts it as used.
+        key = job_key(kind, args, kwargs)
+        with self._lock:
+            entry = self._jobs.pop(key, None)
+        if entry is None:
+            return None
+        job, _ = entry
+        if job.error is not None:
+            count("prefetch_failed", kind=kind)
+            return None
+        count("prefetch_used", kind=kind, state="ready" if job.done else "running")
+        return job
+
+    def stats(self):
+        with self._lock:
+            return {
+                "tracked": len(self._jobs),
+                "running": sum(not job.done for job, _ in self._jobs.values()),
+            }
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher():
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = Prefetcher()
+        return _prefetcher
+
+
+def prefetch_budget(trip):
+    return get_prefetcher().start("budget", get_budget_plan, **budget_kwargs(trip))
+
+
+def prefetch_itinerary(trip):
+    return get_prefetcher().start("itinerary", generate_itinerary, *itinerary_args(trip))
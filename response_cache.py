@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import annotate
+from state_store import get_store
+
+DEFAULT_TTL = int(os.getenv("ANBUPAYAN_CACHE_TTL", 7 * 24 * 3600))
+MEMORY_ENTRIES = int(os.getenv("ANBUPAYAN_CACHE_MEMORY_ENTRIES", 256))
+DISK_ENTRIES = int(os.getenv("ANBUPAYAN_CACHE_DISK_ENTRIES", 20000))
+
+
+def _normalize(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return " ".join(str(value).split()).casefold()
+
+
+def _normalize_interests(interests):
+    items = {_normalize(item) for item in str(interests or "").split(",")}
+    return sorted(item for item in items if item)
+
+
+def make_key(**fields) -> str:
+    # Equivalent requests ("Chennai " vs "chennai", "Food, Culture" vs
+    # "culture,food") must land on the same entry.
+    normalized = {}
+    for name, value in fields.items():
+        if name == "interests":
+            normalized[name] = _normalize_interests(value)
+        else:
+            normalized[name] = _normalize(value)
+    payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    # A small in-process LRU in front of the shared state store, so a
+    # response generated by any worker process is reused by all of them.
+
+    def __init__(self, namespace="responses", ttl=DEFAULT_TTL, memory_entries=MEMORY_ENTRIES, disk_entries=DISK_ENTRIES, store=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self._store = store
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @property
+    def store(self):
+        return self._store or get_store()
+
+    def _remember(self, key, value, expires_at):
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    annotate(cache_hit=True)
+                    return value
+                del self._memory[key]
+
+        stored = self.store.get_many(self.namespace, [key], touch=True, with_expiry=True).get(key)
+        with self._lock:
+            if stored is not None:
+                # The memory copy expires with the stored one, which may have
+                # been written with a shorter TTL (e.g. a geocode miss).
+                value, expires_at = stored
+                self._remember(key, value, expires_at)
+                self.hits += 1
+                self.disk_hits += 1
+                annotate(cache_hit=True, disk_hit=True)
+                return value
+            self.misses += 1
+            annotate(cache_miss=True)
+            return None
+
+    def get_many(self, keys):
+        # Like get() for a batch of keys, with one store query for
+        # everything the memory tier does not hold.
+        now = time.time()
+        found = {}
+        with self._lock:
+            missing = []
+            for key in dict.fromkeys(keys):
+                entry = self._memory.get(key)
+                if entry is not None and entry[1] > now:
+                    self._memory.move_to_end(key)
+                    found[key] = entry[0]
+                else:
+                    missing.append(key)
+        stored = self.store.get_many(self.namespace, missing, touch=True, with_expiry=True) if missing else {}
+        with self._lock:
+            for key, (value, expires_at) in stored.items():
+                self._remember(key, value, expires_at)
+                found[key] = value
+            self.hits += len(found)
+            self.disk_hits += len(stored)
+            self.misses += len(missing) - len(stored)
+        return found
+
+    def set_many(self, items, ttl=None):
+        if not items:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            for key, value in items.items():
+                self._remember(key, value, time.time() + ttl)
+            self._writes += len(items)
+        self.store.set_many(self.namespace, items, ttl)
+        self._evict()
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._remember(key, value, time.time() + ttl)
+            self._writes += 1
+            evict = self._writes % 100 == 0
+        self.store.set(self.namespace, key, value, ttl)
+        if evict:
+            self._evict()
+
+    def _evict(self):
+        self.store.trim(self.namespace, self.disk_entries)
+
+    def get_or_create(self, key, create):
+        value = self.get(key)
+        if value is None:
+            value = create()
+            if value:
+                self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        self.store.clear(self.namespace)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_cache():
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
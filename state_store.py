@@ -0,0 +1,284 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# State that has to survive a user moving between Streamlit worker
+# processes: generated plans and chat memory per session, plus the response,
+# geocode and answer caches. "sqlite" keeps it in one file that every worker
+# opens (put ANBUPAYAN_CACHE_DIR or ANBUPAYAN_STATE_PATH on a shared volume);
+# "memory" keeps it in the process, for tests and single-process runs.
+CACHE_DIR = os.getenv("ANBUPAYAN_CACHE_DIR", ".cache")
+STATE_BACKEND = os.getenv("ANBUPAYAN_STATE_BACKEND", "sqlite")
+STATE_PATH = os.getenv("ANBUPAYAN_STATE_PATH", os.path.join(CACHE_DIR, "state.sqlite3"))
+# WAL is fastest for processes on one machine; network filesystems need DELETE.
+STATE_JOURNAL = os.getenv("ANBUPAYAN_STATE_JOURNAL", "WAL")
+SESSION_TTL = int(os.getenv("ANBUPAYAN_SESSION_TTL", 30 * 24 * 3600))
+SESSION_ENTRIES = int(os.getenv("ANBUPAYAN_SESSION_ENTRIES", 200000))
+# An unchanged value is written again this often, so a session that is in
+# use never reaches SESSION_TTL.
+SESSION_REFRESH = 3600
+BUSY_TIMEOUT_MS = 10000
+SESSION_DIGESTS = 10000
+
+
+class MemoryStore:
+    def __init__(self):
+        self._data = {}
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def get_many(self, namespace, keys, touch=False, with_expiry=False):
+        # {key: value}, or {key: (value, expires_at)} with with_expiry.
+        now = time.time()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._data.get((namespace, key))
+                if entry is not None and entry[1] > now:
+                    found[key] = (entry[0], entry[1]) if with_expiry else entry[0]
+                    if touch:
+                        self._data[(namespace, key)] = entry[:3] + (now, entry[4])
+        return found
+
+    def get(self, namespace, key, touch=False):
+        return self.get_many(namespace, [key], touch).get(key)
+
+    def set_many(self, namespace, items, ttl):
+        now = time.time()
+        with self._lock:
+            for key, value in items.items():
+                self._seq += 1
+                self._data[(namespace, key)] = (value, now + ttl, now, now, self._seq)
+
+    def set(self, namespace, key, value, ttl):
+        self.set_many(namespace, {key: value}, ttl)
+
+    def delete(self, namespace, key):
+        with self._lock:
+            self._data.pop((namespace, key), None)
+
+    def changed_since(self, namespace, after, limit):
+        # [(seq, key, value, updated_at)] for rows written after the write
+        # numbered after, in write order, for keeping a local index in step
+        # with what other processes wrote. seq only grows, whatever the
+        # clocks of the writers say.
+        now = time.time()
+        with self._lock:
+            rows = [
+                (seq, key, value, updated_at)
+                for (entry_namespace, key), (value, expires_at, updated_at, _, seq) in self._data.items()
+                if entry_namespace == namespace and seq > after and expires_at > now
+            ]
+        return sorted(rows)[:limit]
+
+    def trim(self, namespace, max_entries):
+        now = time.time()
+        with self._lock:
+            entries = [(key, entry) for key, entry in self._data.items() if key[0] == namespace]
+            for key, entry in entries:
+                if entry[1] <= now:
+                    del self._data[key]
+            live = sorted((entry[3], key) for key, entry in entries if entry[1] > now)
+            for _, key in live[:max(0, len(live) - max_entries)]:
+                del self._data[key]
+
+    def clear(self, namespace):
+        with self._lock:
+            for key in [key for key in self._data if key[0] == namespace]:
+                del self._data[key]
+
+
+class SQLiteStore:
+    def __init__(self, path=STATE_PATH, journal=STATE_JOURNAL):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # One connection per process, serialised by a lock; other processes
+        # are kept out by SQLite's own file locking, and every multi-row
+        # write is one transaction.
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=BUSY_TIMEOUT_MS / 1000)
+        self._lock = threading.Lock()
+        self._db.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        self._db.execute(f"PRAGMA journal_mode={journal}")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS state ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, updated_at REAL NOT NULL, accessed_at REAL NOT NULL, "
+            "PRIMARY KEY (namespace, key))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS state_accessed ON state (namespace, accessed_at)")
+
+    def get_many(self, namespace, keys, touch=False, with_expiry=False):
+        now = time.time()
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT key, value, expires_at FROM state WHERE namespace = ? AND expires_at > ? "
+                    f"AND key IN ({','.join('?' * len(batch))})",
+                    [namespace, now] + batch,
+                ).fetchall()
+                found.update((key, (value, expires_at) if with_expiry else value) for key, value, expires_at in rows)
+            if touch and found:
+                self._db.executemany(
+                    "UPDATE state SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    [(now, namespace, key) for key in found],
+                )
+        return found
+
+    def get(self, namespace, key, touch=False):
+        return self.get_many(namespace, [key], touch).get(key)
+
+    def set_many(self, namespace, items, ttl):
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO state (namespace, key, value, expires_at, updated_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(namespace, key, value, now + ttl, now, now) for key, value in items.items()],
+                )
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def set(self, namespace, key, value, ttl):
+        self.set_many(namespace, {key: value}, ttl)
+
+    def delete(self, namespace, key):
+        with self._lock:
+            self._db.execute("DELETE FROM state WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def changed_since(self, namespace, after, limit):
+        # The rowid is the write sequence: every write replaces the row, and
+        # writes are serialised by BEGIN IMMEDIATE, so a new row always gets
+        # a higher rowid than any row committed before it. It only goes back
+        # when the newest rows are deleted (clear()), and then a caller's
+        # position is past the end and starts again from the beginning.
+        with self._lock:
+            if self._db.execute("SELECT COALESCE(MAX(rowid), 0) FROM state").fetchone()[0] < after:
+                after = 0
+            return self._db.execute(
+                "SELECT rowid, key, value, updated_at FROM state WHERE namespace = ? AND rowid > ? AND expires_at > ? "
+                "ORDER BY rowid LIMIT ?",
+                (namespace, after, time.time(), limit),
+            ).fetchall()
+
+    def trim(self, namespace, max_entries):
+        with self._lock:
+            self._db.execute("DELETE FROM state WHERE namespace = ? AND expires_at <= ?", (namespace, time.time()))
+            self._db.execute(
+                "DELETE FROM state WHERE namespace = ? AND key IN ("
+                "SELECT key FROM state WHERE namespace = ? ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (namespace, namespace, max_entries),
+            )
+
+    def clear(self, namespace):
+        with self._lock:
+            self._db.execute("DELETE FROM state WHERE namespace = ?", (namespace,))
+
+
+def create_store(backend=STATE_BACKEND, path=STATE_PATH):
+    if backend == "memory":
+        return MemoryStore()
+    if backend == "sqlite":
+        return SQLiteStore(path)
+    raise ValueError(f"Unknown state backend '{backend}'; use 'sqlite' or 'memory'.")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = create_store()
+        return _store
+
+
+def use_store(store):
+    # Swaps the process-wide store, e.g. for a MemoryStore in tests.
+    global _store
+    with _store_lock:
+        _store = store
+
+
+class SessionStore:
+    # Per-session values (plans, trip details, chat memory) as JSON under
+    # "<session id>:<name>". Only values that changed since this process
+    # last wrote or read them are written back, plus unchanged ones once
+    # per SESSION_REFRESH to push their expiry out.
+
+    def __init__(self, store=None, ttl=SESSION_TTL, max_entries=SESSION_ENTRIES):
+        self._store = store
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._digests = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    @property
+    def store(self):
+        return self._store or get_store()
+
+    def _remember(self, key, digest, written_at):
+        with self._lock:
+            self._digests[key] = (digest, written_at)
+            self._digests.move_to_end(key)
+            while len(self._digests) > SESSION_DIGESTS:
+                self._digests.popitem(last=False)
+
+    def load(self, session_id, names):
+        keys = {f"{session_id}:{name}": name for name in names}
+        found = self.store.get_many("session", keys)
+        values = {}
+        for key, value in found.items():
+            # Not written by this process yet, so the next save refreshes it.
+            self._remember(key, hashlib.sha256(value.encode("utf-8")).hexdigest(), 0.0)
+            values[keys[key]] = json.loads(value)
+        return values
+
+    def save(self, session_id, values):
+        now = time.time()
+        changed = {}
+        for name, value in values.items():
+            key = f"{session_id}:{name}"
+            text = json.dumps(value, ensure_ascii=False, sort_keys=True)
+            digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+            with self._lock:
+                saved = self._digests.get(key)
+            if saved is None or saved[0] != digest or now - saved[1] >= SESSION_REFRESH:
+                changed[key] = (text, digest)
+        # One transaction, so another worker never sees half of a save.
+        self.store.set_many("session", {key: text for key, (text, _) in changed.items()}, self.ttl)
+        for key, (_, digest) in changed.items():
+            self._remember(key, digest, now)
+        with self._lock:
+            before, self._writes = self._writes, self._writes + len(changed)
+        if self._writes // 100 > before // 100:
+            # Expired sessions are removed here, as the caches do for theirs.
+            self.store.trim("session", self.max_entries)
+        return len(changed)
+
+
+_sessions = None
+_sessions_lock = threading.Lock()
+
+
+def get_session_store():
+    global _sessions
+    with _sessions_lock:
+        if _sessions is None:
+            _sessions = SessionStore()
+        return _sessions
@@ -0,0 +1,115 @@
+# Local stand-in for the Gemini API, backed by fake_model. Point the app or
+# the batch CLI at it with ANBUPAYAN_LLM_BACKEND=http://127.0.0.1:8765.
+# It also answers Nominatim-style GET /search requests, for
+# ANBUPAYAN_GEOCODER_URL=http://127.0.0.1:8765.
+#
+#   python stub_server.py --port 8765 --latency 1.5 --error-rate 0.05
+import argparse
+import hashlib
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from fake_model import _prompt_text, fake_reply
+from gazetteer import PlaceError, resolve_place
+
+
+def fake_geocode(query):
+    # "<name>, <town>[, <state>]" lands at a stable spot within a few km of
+    # the town; the state only narrows the town and is the last resort.
+    # Names without a known town are not found.
+    parts = [part.strip() for part in query.split(",")]
+    for near in [", ".join(parts[start:]) for start in range(1, len(parts))] or [query]:
+        try:
+            town = resolve_place(near)
+            break
+        except PlaceError:
+            continue
+    else:
+        return []
+    digest = hashlib.sha256(query.casefold().encode("utf-8")).digest()
+    lat = town.lat + (digest[0] - 128) / 128 * 0.03
+    lon = town.lon + (digest[1] - 128) / 128 * 0.03
+    return [{"place_id": int.from_bytes(digest[:4], "big"), "lat": f"{lat:.6f}", "lon": f"{lon:.6f}", "display_name": f"{query}, India"}]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    chunk_size = 64
+    error_rate = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path != "/search":
+            self._send(404, b'{"error": "not found"}')
+            return
+        if random.random() < self.error_rate:
+            self._send(503, b'{"error": "unavailable"}')
+            return
+        time.sleep(self.latency)
+        query = parse_qs(url.query).get("q", [""])[0]
+        self._send(200, json.dumps(fake_geocode(query)).encode("utf-8"))
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        if random.random() < self.error_rate:
+            self._send(503, b'{"error": "unavailable"}')
+            return
+        text = fake_reply(_prompt_text(request["contents"]))
+        if not request.get("stream"):
+            time.sleep(self.latency)
+            self._send(200, json.dumps({"text": text}).encode("utf-8"))
+            return
+
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)] or [""]
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for chunk in chunks:
+            time.sleep(self.latency / len(chunks))
+            self._write_chunk((json.dumps({"text": chunk}) + "\n").encode("utf-8"))
+        self._write_chunk(b"")
+
+
+def serve(host="127.0.0.1", port=8765, latency=0.0, chunk_size=64, error_rate=0.0):
+    handler = type("ConfiguredStubHandler", (StubHandler,), {
+        "latency": latency, "chunk_size": chunk_size, "error_rate": error_rate,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve fake Gemini responses over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per response")
+    parser.add_argument("--chunk-size", type=int, default=64, help="characters per streamed chunk")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    args = parser.parse_args()
+    server = serve(args.host, args.port, args.latency, args.chunk_size, args.error_rate)
+    print(f"Stub LLM server on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import time
+
+import pytest
+
+from answer_cache import SemanticAnswerCache, is_context_free
+from state_store import MemoryStore
+
+HOTELS = "What are the best budget hotels and cheap local restaurants for a family holiday near the railway station in {}?"
+CHEAPEST = "What is the cheapest way to travel from Chennai to Madurai by {} in December?"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    return now
+
+
+def make_cache(**kwargs):
+    return SemanticAnswerCache(store=MemoryStore(), sync=float("inf"), **kwargs)
+
+
+def test_rephrased_question_hits():
+    cache = make_cache()
+    cache.add("How do I book a train from Chennai to Bangalore?", "English", "answer")
+    assert cache.lookup("how to book a train from chennai to bangalore", "English")[0] == "answer"
+    assert cache.lookup("How do I book a train to Bangalore from Chennai?", "English")[0] == "answer"
+
+
+@pytest.mark.parametrize("city", ["Mumbai", "Manali", "Madikeri", "mumbai", "manali", "madikeri"])
+def test_different_city_misses(city):
+    cache = make_cache()
+    cache.add(HOTELS.format("Madurai"), "English", "answer")
+    assert cache.lookup(HOTELS.format("madurai"), "English")[0] == "answer"
+    assert cache.lookup(HOTELS.format(city), "English")[0] is None
+
+
+def test_reversed_route_misses():
+    cache = make_cache()
+    cache.add("how do I book a train from chennai to bangalore", "English", "answer")
+    assert cache.lookup("how do I book a train from bangalore to chennai", "English")[0] is None
+
+
+@pytest.mark.parametrize("mode", ["bus", "flight", "cab", "car"])
+def test_different_travel_mode_misses(mode):
+    cache = make_cache()
+    cache.add(CHEAPEST.format("train"), "English", "answer")
+    assert cache.lookup(CHEAPEST.format("train"), "English")[0] == "answer"
+    assert cache.lookup(CHEAPEST.format(mode), "English")[0] is None
+
+
+def test_different_language_misses():
+    cache = make_cache()
+    cache.add(CHEAPEST.format("train"), "English", "answer")
+    assert cache.lookup(CHEAPEST.format("train"), "Tamil")[0] is None
+
+
+def test_questions_about_stored_details_go_around_the_cache():
+    memory = {"budget": "20000", "destination": "Madurai"}
+    assert not is_context_free("What can I do there within my budget?", memory)
+    assert not is_context_free("Which hotels near the temple are good value?", memory)
+    assert is_context_free("Which hotels are good value with a budget of ₹20000 on a trip to Madurai?", memory)
+    assert is_context_free("Which hotels near the temple are good value?", {})
+    assert not is_context_free("Trains?", {})
+
+
+def test_entries_expire(clock):
+    cache = make_cache(ttl=60)
+    cache.add(CHEAPEST.format("train"), "English", "answer")
+    clock[0] += 59
+    assert cache.lookup(CHEAPEST.format("train"), "English")[0] == "answer"
+    clock[0] += 2
+    assert cache.lookup(CHEAPEST.format("train"), "English")[0] is None
+    assert len(cache) == 0
+
+
+def test_eviction_keeps_frequently_used_entries(clock):
+    cache = make_cache(max_entries=4)
+    questions = [CHEAPEST.format(mode) for mode in ("train", "bus", "flight", "cab", "car")]
+    cache.add(questions[0], "English", "train")
+    clock[0] += 1
+    assert cache.lookup(questions[0], "English")[0] == "train"
+    for question in questions[1:4]:
+        clock[0] += 1
+        cache.add(question, "English", question)
+    clock[0] += 1
+    cache.add(questions[4], "English", "car")
+    # The train answer is the least recently used but has been used once;
+    # the bus answer is as old and never used, so it goes.
+    assert len(cache) == 4
+    assert cache.lookup(questions[0], "English")[0] == "train"
+    assert cache.lookup(questions[1], "English")[0] is None
+    assert cache.lookup(questions[4], "English")[0] == "car"
+
+
+def test_least_recently_used_entry_goes_first(clock):
+    cache = make_cache(max_entries=2)
+    cache.add(CHEAPEST.format("train"), "English", "train")
+    clock[0] += 1
+    cache.add(CHEAPEST.format("bus"), "English", "bus")
+    clock[0] += 1
+    assert cache.lookup(CHEAPEST.format("train"), "English")[0] == "train"
+    clock[0] += 1
+    cache.add(CHEAPEST.format("flight"), "English", "flight")
+    assert cache.lookup(CHEAPEST.format("bus"), "English")[0] is None
+    assert cache.lookup(CHEAPEST.format("train"), "English")[0] == "train"
@@ -0,0 +1,69 @@
+import pytest
+
+from budget_math import EXCEEDS_NOTE, FITS_NOTE, TOTAL_LABEL, Amount, check_budget, format_inr, parse_amount
+
+HEADER = ["Category", "Details", "Estimated Cost (INR)"]
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("4500", Amount(4500, 4500)),
+        ("₹1,20,000", Amount(120000, 120000)),
+        ("Rs. 2,500/-", Amount(2500, 2500)),
+        ("5,000 - 8,000", Amount(5000, 8000)),
+        ("approx. 3k", Amount(3000, 3000)),
+        ("1.2 lakh", Amount(120000, 120000)),
+        ("₹1,500 x 2 = ₹3,000", Amount(3000, 3000)),
+        ("800 + 1,200", Amount(2000, 2000)),
+        ("Free", Amount(0, 0)),
+        ("₹500 per person", Amount(500, 500, True)),
+        ("1,500 (per person)", Amount(1500, 1500, True)),
+        ("6,000 (1,500 per person)", Amount(6000, 6000)),
+        ("6,000 [1,500 each]", Amount(6000, 6000)),
+    ],
+)
+def test_parse_amount(text, expected):
+    assert parse_amount(text) == expected
+
+
+@pytest.mark.parametrize("text", ["", "Varies", "depends on season"])
+def test_parse_amount_unreadable(text):
+    assert parse_amount(text) is None
+
+
+@pytest.mark.parametrize("value, expected", [(0, "0"), (999, "999"), (1000, "1,000"), (120000, "1,20,000"), (12345678, "1,23,45,678")])
+def test_format_inr(value, expected):
+    assert format_inr(value) == expected
+
+
+def test_check_budget_people_and_total():
+    table = [
+        HEADER,
+        ["Transport", "Train tickets", "500 per person"],
+        ["Food", "Meals for the group", "6,000 (1,500 per person)"],
+        [TOTAL_LABEL, "", "1000"],
+    ]
+    check = check_budget(table, "Fits within budget.", 3, days=2, people=4, user_budget=10000)
+    assert check.table_data[1][2] == "2,000"
+    assert check.table_data[2][2] == "6,000 (1,500 per person)"
+    assert check.table_data[3] == [TOTAL_LABEL, "", "8,000"]
+    assert check.notes == FITS_NOTE
+
+
+def test_check_budget_accommodation_rooms_and_nights():
+    table = [
+        HEADER,
+        ["Accommodation", "1 room for 3 nights at 2,000 per night", "6000"],
+    ]
+    check = check_budget(table, "", None, days=2, people=4, user_budget=5000)
+    assert check.table_data[1] == ["Accommodation", "2 room for 2 nights at 2,000 per night", "8,000"]
+    assert check.table_data[2] == [TOTAL_LABEL, "", "8,000"]
+    assert check.notes == EXCEEDS_NOTE
+
+
+def test_check_budget_unparsed_rows_excluded():
+    table = [HEADER, ["Food", "Street food", "Varies"], ["Transport", "Bus", "300"], [TOTAL_LABEL, "", "300"]]
+    check = check_budget(table, "Fits within budget", 3, days=1, people=1, user_budget=1000)
+    assert check.unparsed == [1]
+    assert check.table_data[3] == [TOTAL_LABEL, "excluding Food", "300"]
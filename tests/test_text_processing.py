@@ -0,0 +1,96 @@
+import random
+
+import pytest
+
+from text_processing import IncrementalCleaner, clean_response_text, days_mentioned, split_day_blocks
+
+ITINERARY = """Here is your trip.
+Day 1: Arrive in Madurai
+- Meenakshi Temple
+Day 2: Rameswaram
+- Ramanathaswamy Temple
+Day 3: Kodaikanal
+- Lake walk
+Category | Details | Cost
+Total Estimated Cost |  | 9000
+"""
+
+RESPONSES = [
+    ITINERARY,
+    "**Day 1:** Visit the <b>Meenakshi</b> temple_\n\n\n  \nDay 2: ```json\n{\"a\": 1}\n``` beach\n",
+    "\n\n  Intro with `code` and a < b but c > d\n\n```unterminated fence\nstill text",
+    "<p>Tags <br/>split <span class='x'>across</span> lines</p>\n \t\n\nEnd<",
+    "Edge ``` ` `` `````` cases <> << >> <<a>> and trailing spaces   \n\n",
+    "Budget\n| Category | Details | Cost |\n|---|---|---|\n| Food | *meals* | ₹1,500 |\n\n\nநாள் 1: கோயில்\n",
+]
+
+
+def random_chunks(text, rng):
+    count = min(max(len(text) - 1, 0), rng.randint(0, 12))
+    cuts = sorted(rng.sample(range(1, len(text)), count)) if count else []
+    return [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+
+
+@pytest.mark.parametrize("text", RESPONSES)
+def test_incremental_cleaner_matches_full_cleanup(text):
+    rng = random.Random(text)
+    expected = clean_response_text(text)
+    for _ in range(200):
+        cleaner = IncrementalCleaner()
+        chunks = random_chunks(text, rng) if rng.random() < 0.8 else list(text)
+        assert "".join(cleaner.feed(chunk) for chunk in chunks) + cleaner.close() == expected
+
+
+def test_incremental_cleaner_random_text():
+    rng = random.Random(0)
+    alphabet = ["`", "```", "*", "_", "<", ">", "<b>", "\n", "\n\n", " ", "\t", "a", "Day 1:", "|", "நா"]
+    for _ in range(500):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+        cleaner = IncrementalCleaner()
+        output = "".join(cleaner.feed(chunk) for chunk in random_chunks(text, rng)) + cleaner.close()
+        assert output == clean_response_text(text), repr(text)
+
+
+@pytest.mark.parametrize(
+    "suggestion, expected",
+    [
+        ("Add a beach visit on Day 3", [3]),
+        ("Make day 2 less busy", [2]),
+        ("Change days 2-4 to hill stations", [2, 3, 4]),
+        ("Change days 2 to 4", [2, 3, 4]),
+        ("Swap day 1 and 5", [1, 5]),
+        ("Rework days 1, 3 & 6", [1, 3, 6]),
+        ("Start slower on the first day", [1]),
+        ("Leave the last day free", [7]),
+        ("More shopping on the final day and day 2", [2, 7]),
+        ("Skip day 9", []),
+        ("Change days 5-30000000", [5, 6, 7]),
+        ("Add more temples", []),
+        ("", []),
+    ],
+)
+def test_days_mentioned(suggestion, expected):
+    assert days_mentioned(suggestion, 7) == expected
+
+
+@pytest.mark.parametrize(
+    "suggestion",
+    ["Start every Sunday 2 pm", "Book for today 5 people", "Leave on Monday 3 pm after lunch", "Holiday 4 is fine", "Use the midday 1 hour break"],
+)
+def test_times_are_not_days(suggestion):
+    assert days_mentioned(suggestion, 7) == []
+
+
+def test_split_day_blocks_keeps_summary_separate():
+    blocks = split_day_blocks(ITINERARY)
+    assert blocks.preamble == "Here is your trip."
+    assert blocks.day_numbers() == [1, 2, 3]
+    assert blocks.days[2] == (3, "Day 3: Kodaikanal\n- Lake walk")
+    assert blocks.summary == "Category | Details | Cost\nTotal Estimated Cost |  | 9000"
+    assert blocks.text() == ITINERARY.strip()
+
+
+def test_split_day_blocks_without_days():
+    blocks = split_day_blocks("Plan a relaxed trip.")
+    assert blocks.preamble == "Plan a relaxed trip."
+    assert blocks.days == [] and blocks.summary == ""
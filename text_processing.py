@@ -0,0 +1,237 @@
+import re
+from dataclasses import dataclass, field
+
+BUDGET_HEADER = ["Category", "Details", "Estimated Cost (INR)"]
+
+_FENCE = "```"
+_MARKUP_CHARS = re.compile(r'[*_`]')
+_BLANK_LINES = re.compile(r'\n\s*\n')
+_LINE_BREAKS = "\r\n\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+
+
+def clean_response_text(text: str) -> str:
+    text = re.sub(r'```[\s\S]*?```', '', text)
+    text = re.sub(r'[*_`]', '', text)
+    text = re.sub(r'<[^>]+>', '', text)
+    text = re.sub(r'\n\s*\n', '\n', text)
+    return text.strip()
+
+
+class IncrementalCleaner:
+    # Streaming equivalent of clean_response_text: joining everything returned
+    # by feed() and close() gives the same result as cleaning the full text.
+    # Anything that could still turn into a code fence, a tag or a blank-line
+    # run is held back until the next chunk decides it.
+
+    def __init__(self):
+        self._raw = ""
+        self._in_fence = False
+        self._tag = ""
+        self._space = ""
+        self._started = False
+
+    def feed(self, chunk: str) -> str:
+        self._raw += chunk
+        out = []
+        while True:
+            if self._in_fence:
+                end = self._raw.find(_FENCE, len(_FENCE))
+                if end == -1:
+                    break
+                self._raw = self._raw[end + len(_FENCE):]
+                self._in_fence = False
+            else:
+                start = self._raw.find(_FENCE)
+                if start == -1:
+                    safe = len(self._raw.rstrip("`"))
+                    out.append(self._strip_tags(self._raw[:safe]))
+                    self._raw = self._raw[safe:]
+                    break
+                out.append(self._strip_tags(self._raw[:start]))
+                self._raw = self._raw[start:]
+                self._in_fence = True
+        return "".join(out)
+
+    def close(self) -> str:
+        # An unterminated fence or "<" is left alone by the regexes, so it is
+        # flushed as ordinary text.
+        out = [self._strip_tags(self._raw)]
+        self._raw = ""
+        self._in_fence = False
+        tail, self._tag = self._tag, ""
+        out.append(self._collapse_space(tail))
+        self._space = ""
+        return "".join(out)
+
+    def _strip_tags(self, text):
+        buf = self._tag + _MARKUP_CHARS.sub("", text)
+        self._tag = ""
+        out = []
+        i = 0
+        while True:
+            lt = buf.find("<", i)
+            if lt == -1:
+                out.append(buf[i:])
+                break
+            out.append(buf[i:lt])
+            if lt + 1 == len(buf):
+                self._tag = buf[lt:]
+                break
+            if buf[lt + 1] == ">":
+                out.append("<")
+                i = lt + 1
+                continue
+            gt = buf.find(">", lt + 1)
+            if gt == -1:
+                self._tag = buf[lt:]
+                break
+            i = gt + 1
+        return self._collapse_space("".join(out))
+
+    def _collapse_space(self, text):
+        buf = self._space + text
+        body = buf.rstrip()
+        self._space = buf[len(body):]
+        if not body:
+            return ""
+        if not self._started:
+            body = body.lstrip()
+            self._started = True
+        return _BLANK_LINES.sub("\n", body)
+
+
+class IncrementalBudgetParser:
+    # Builds the budget table row by row from cleaned text; rows are only
+    # parsed once their line is complete.
+
+    def __init__(self):
+        self.table_data = [list(BUDGET_HEADER)]
+        self.notes = ""
+        self.total_row_idx = None
+        self._pending = ""
+
+    def feed(self, text: str) -> int:
+        lines = (self._pending + text).splitlines(keepends=True)
+        self._pending = ""
+        if lines and not lines[-1].endswith(tuple(_LINE_BREAKS)):
+            self._pending = lines.pop()
+        rows_before = len(self.table_data)
+        for line in lines:
+            self._add_line(line)
+        return len(self.table_data) - rows_before
+
+    def close(self) -> int:
+        pending, self._pending = self._pending, ""
+        rows_before = len(self.table_data)
+        self._add_line(pending)
+        return len(self.table_data) - rows_before
+
+    def result(self):
+        return self.table_data, self.notes.strip(), self.total_row_idx
+
+    def _add_line(self, line):
+        line = line.strip()
+        if not line:
+            return
+
+        if re.match(r'(?i)category\s*\|\s*details.*\|\s*estimated cost', line):
+            return
+
+        if re.search(r'Fits within budget|Exceeds budget', line, re.IGNORECASE):
+            self.notes = line
+            return
+
+        if re.match(r'(?i)total', line):
+            parts = [p.strip() for p in line.split("|")]
+            while len(parts) < 3:
+                parts.append("")
+            self.table_data.append(parts[:3])
+            self.total_row_idx = len(self.table_data) - 1
+            return
+
+        if "Total Estimated Cost" in line:
+            match = re.search(r'(\d[\d,]*)', line)
+            total_value = match.group(1) if match else ""
+            self.table_data.append(["Total Estimated Cost", "", total_value])
+            self.total_row_idx = len(self.table_data) - 1
+            return
+
+        if "|" in line:
+            parts = [p.strip() for p in line.split("|")]
+            while len(parts) < 3:
+                parts.append("")
+            self.table_data.append(parts[:3])
+            return
+
+        self.notes += (" " + line)
+
+
+def parse_budget_text(cleaned_text: str):
+    parser = IncrementalBudgetParser()
+    parser.feed(cleaned_text)
+    parser.close()
+    return parser.result()
+
+
+# "Day" as Gemini tends to write it in each supported language.
+DAY_WORDS = r"(?:Day|दिन|दिवस|দিন|రోజు|நாள்|દિવસ|ದಿನ|ദിവസം|ਦਿਨ|ᱫᱤᱱ)"
+DAY_MARKER = re.compile(r"^\s*" + DAY_WORDS + r"\s*(\d+)\s*[:：]", re.IGNORECASE | re.MULTILINE)
+# \b keeps "Sunday 2 pm" and "today 5 people" from reading as days 2 and 5.
+_DAY_REFERENCE = re.compile(
+    r"\b" + DAY_WORDS + r"s?\s*((?:\d+\s*(?:,|&|and|or|-|–|to)\s*)*\d+)", re.IGNORECASE
+)
+
+
+@dataclass
+class ItineraryBlocks:
+    preamble: str = ""
+    days: list = field(default_factory=list)  # [(day_number, block_text), ...]
+    summary: str = ""
+
+    def day_numbers(self):
+        return [number for number, _ in self.days]
+
+    def text(self):
+        parts = [self.preamble] + [block for _, block in self.days] + [self.summary]
+        return "\n".join(part for part in parts if part)
+
+
+def split_day_blocks(itinerary_text: str) -> ItineraryBlocks:
+    # Day blocks run from one "Day X:" line to the next. The cost summary
+    # starts at the first "|" line after the last day, as the prompt asks
+    # for "|" only in the summary.
+    markers = list(DAY_MARKER.finditer(itinerary_text))
+    if not markers:
+        return ItineraryBlocks(preamble=itinerary_text.strip())
+    blocks = ItineraryBlocks(preamble=itinerary_text[:markers[0].start()].strip())
+    for marker, following in zip(markers, markers[1:] + [None]):
+        end = following.start() if following else len(itinerary_text)
+        blocks.days.append((int(marker.group(1)), itinerary_text[marker.start():end].strip()))
+
+    number, last = blocks.days[-1]
+    lines = last.splitlines()
+    for i, line in enumerate(lines[1:], start=1):
+        if "|" in line:
+            blocks.days[-1] = (number, "\n".join(lines[:i]).strip())
+            blocks.summary = "\n".join(lines[i:]).strip()
+            break
+    return blocks
+
+
+def days_mentioned(suggestion: str, total_days: int):
+    # Day numbers a suggestion refers to: "Day 3", "days 2-4", "day 1 and 5",
+    # "first day", "last day". An empty list means it is not day-specific.
+    days = set()
+    for match in _DAY_REFERENCE.finditer(suggestion or ""):
+        spec = match.group(1)
+        for start, end in re.findall(r"(\d+)\s*(?:-|–|to)\s*(\d+)", spec):
+            # Clamped first, so "day 1-30000000" does not build a huge range.
+            start, end = max(int(start), 1), min(int(end), total_days)
+            days.update(range(start, end + 1))
+        days.update(int(n) for n in re.findall(r"\d+", spec))
+    lowered = (suggestion or "").lower()
+    if re.search(r"\b(?:first|1st) day\b", lowered):
+        days.add(1)
+    if re.search(r"\b(?:last|final) day\b", lowered):
+        days.add(total_days)
+    return sorted(day for day in days if 1 <= day <= total_days)
@@ -0,0 +1,66 @@
+import re
+
+import folium
+
+from gazetteer import PlaceError, resolve_place
+from geocoding import get_geocoder
+
+# A run of capitalised words is taken as a place name when it contains one
+# of these, e.g. "Meenakshi Amman Temple", "Hotel Residency", "Marina Beach".
+POI_WORDS = {
+    "temple", "kovil", "mandir", "fort", "palace", "mahal", "beach", "lake", "falls", "museum", "park",
+    "garden", "gardens", "market", "bazaar", "church", "basilica", "cathedral", "mosque", "masjid", "dargah",
+    "gurudwara", "ghat", "ghats", "hill", "hills", "peak", "point", "caves", "island", "dam", "zoo",
+    "sanctuary", "gallery", "memorial", "tower", "gate", "gateway", "bridge", "monastery", "stupa", "mall",
+    "hotel", "resort", "inn", "lodge", "residency", "homestay", "restaurant", "cafe", "café", "mess", "bhavan",
+    "bhawan", "dhaba", "shop", "station", "airport",
+}
+# Words that often start a sentence before the name itself.
+LEADING_WORDS = {
+    "visit", "explore", "see", "head", "check", "lunch", "dinner", "breakfast", "stay", "morning", "afternoon",
+    "evening", "day", "then", "enjoy", "take", "return", "relax", "walk", "at", "the", "and", "shopping", "try",
+}
+MAX_PLACES = 40
+
+_NAME_RUN = re.compile(r"[A-Z][\w'’-]*(?:[ \t]+(?:(?:of|the|de|&)[ \t]+)?[A-Z][\w'’-]*)*")
+
+
+def extract_place_names(text):
+    names = []
+    for match in _NAME_RUN.finditer(text or ""):
+        words = match.group(0).split()
+        while words and words[0].casefold() in LEADING_WORDS:
+            words.pop(0)
+        if len(words) >= 2 and POI_WORDS.intersection(word.casefold() for word in words):
+            names.append(" ".join(words))
+    return list(dict.fromkeys(names))[:MAX_PLACES]
+
+
+def budget_place_names(table_data):
+    # The Details column of every row but the header.
+    return extract_place_names("\n".join(row[1] for row in table_data[1:] if len(row) > 1))
+
+
+def build_map(names, destination):
+    # Returns a folium map with a marker per located name, or None when
+    # neither the destination nor any name could be placed.
+    try:
+        town = resolve_place(destination, "destination")
+    except PlaceError:
+        town = None
+    near = town.label if town else destination
+    located = get_geocoder().geocode_many(names, near=near)
+    if town is None and not located:
+        return None
+
+    center = (town.lat, town.lon) if town else next((p["lat"], p["lon"]) for p in located.values())
+    trip_map = folium.Map(location=center, zoom_start=12)
+    for name, place in located.items():
+        folium.Marker((place["lat"], place["lon"]), tooltip=name, popup=place["address"]).add_to(trip_map)
+    if len(located) > 1:
+        points = [(place["lat"], place["lon"]) for place in located.values()]
+        trip_map.fit_bounds([
+            (min(lat for lat, _ in points), min(lon for _, lon in points)),
+            (max(lat for lat, _ in points), max(lon for _, lon in points)),
+        ])
+    return trip_map